@@ -0,0 +1,66 @@
+"""
+Examples of the Builder pattern, importable without running the demos.
+
+Submodules are only imported when one of their names is first used, so
+`from Builder import HtmlBuilder` loads ordinary_builder.py and nothing else.
+Run a module to see its demo, e.g. `python -m Builder.builder_facets`.
+
+builder_facets and builder_inheritance both define Person, PersonBuilder and
+PersonJobBuilder. The names here are the builder_facets ones, import the
+others from Builder.builder_inheritance.
+"""
+from importlib import import_module
+
+
+_submodules = ("naive_builder", "ordinary_builder", "builder_facets", "builder_inheritance", "exercise")
+
+# name -> submodule it lives in
+_exports = {
+    # ordinary_builder
+    "HtmlElement": "ordinary_builder",
+    "HtmlBuilder": "ordinary_builder",
+    "HtmlElementParser": "ordinary_builder",
+    "HtmlLoader": "ordinary_builder",
+    # builder_facets
+    "Person": "builder_facets",
+    "PersonChanges": "builder_facets",
+    "PersonBuilder": "builder_facets",
+    "PersonAddressBuilder": "builder_facets",
+    "PersonJobBuilder": "builder_facets",
+    "ConcurrentPersonBuilder": "builder_facets",
+    "PersonBatchBuilder": "builder_facets",
+    "ObjectPool": "builder_facets",
+    "Address": "builder_facets",
+    "Job": "builder_facets",
+    "PersonSnapshot": "builder_facets",
+    "PersonSnapshotBuilder": "builder_facets",
+    "PersonSnapshotAddressBuilder": "builder_facets",
+    "PersonSnapshotJobBuilder": "builder_facets",
+    "PersonRecords": "builder_facets",
+    # builder_inheritance
+    "PersonBuilderInterface": "builder_inheritance",
+    "PersonInfoBuilder": "builder_inheritance",
+    "PersonBirthDateBuilder": "builder_inheritance",
+    "OpinionatedPersonBuilder": "builder_inheritance",
+    "flatten_builder": "builder_inheritance",
+    # exercise
+    "Field": "exercise",
+    "Class": "exercise",
+    "CodeBuilder": "exercise",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return import_module(f".{name}", __name__)
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_exports[name]}", __name__), name)
+    globals()[name] = value  # next time it is found without __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_exports) | set(_submodules))
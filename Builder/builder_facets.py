@@ -9,7 +9,22 @@ of PersonAddressBuilder and PersonJobBuilder, respectively. And since both of th
 inherit from PersonBuilder and provide fluent methods for setting the attributes, we
 can chain them together to set all the attributes of a Person object as necessary.
 """
-from copy import deepcopy
+import os
+import struct
+from collections import deque
+from copy import copy, deepcopy
+from functools import cache
+from itertools import compress, islice, repeat
+from operator import eq, itemgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, NamedTuple, Sequence
+
+if TYPE_CHECKING:
+    from SOLID.snapshot_file import SnapshotWriter
+
+
+# Values that can be shared between copies, because they can not change
+IMMUTABLE_TYPES = (str, int, float, bool, type(None))
 
 
 class Person:
@@ -29,29 +44,124 @@ class Person:
             + f"Employed at {self.company_name} as a {self.postcode} earning {self.annual_income}"
         )
 
+    # Clears all fields so a pooled Person can be used again
+    def reset(self) -> "Person":
+        self.__init__()
+        return self
+
+    # The generic copy functions go through __reduce_ex__ and reflection. A Person
+    # is just a handful of fields, so copying the __dict__ directly is much faster.
+    def __copy__(self) -> "Person":
+        person = self.__class__.__new__(self.__class__)
+        person.__dict__.update(self.__dict__)
+        return person
+
+    def __deepcopy__(self, memo: dict) -> "Person":
+        person = self.__class__.__new__(self.__class__)
+        memo[id(self)] = person
+        for name, value in self.__dict__.items():
+            if not isinstance(value, IMMUTABLE_TYPES):
+                value = deepcopy(value, memo)
+            person.__dict__[name] = value
+        return person
+
+
+"""
+Copying the whole template for every variant is wasteful when only a couple
+of fields change. PersonChanges stands in for the Person while the builder
+works on it: reading a field falls through to the shared template, and
+writing a field only records it. At build() the template is shallow copied
+once and the recorded changes are applied on top, so the template itself is
+never modified.
+"""
+class PersonChanges:
+    __slots__ = ("template", "changes")
+
+    def __init__(self, template: Person) -> None:
+        object.__setattr__(self, "template", template)
+        object.__setattr__(self, "changes", {})
+
+    def __getattr__(self, name: str):
+        # Special names such as __deepcopy__ belong to PersonChanges itself,
+        # the template's would copy it without the changes
+        if name[:2] == name[-2:] == "__":
+            raise AttributeError(name)
+        changes = self.changes
+        if name in changes:
+            return changes[name]
+        return getattr(self.template, name)
+
+    def __setattr__(self, name: str, value) -> None:
+        self.changes[name] = value
+
+    # Dunder methods are looked up on the type, so __getattr__ does not cover them
+    def __str__(self) -> str:
+        return str(self.materialize())
+
+    def __copy__(self) -> Person:
+        return self.materialize()
+
+    def __deepcopy__(self, memo: dict) -> Person:
+        return deepcopy(self.materialize(), memo)
+
+    def materialize(self) -> Person:
+        person = copy(self.template)
+        person.__dict__.update(self.changes)
+        return person
+
 
 class PersonBuilder:  # facade
-    def __init__(self, person: Person | None = None, copy=False) -> None:
+    def __init__(
+        self, person: Person | PersonChanges | None = None, copy=False, copy_on_write=False
+    ) -> None:
         if person is None:
             self.person = Person()
         else:
             if copy:
                 self.person = deepcopy(person)
+            elif copy_on_write:
+                self.person = PersonChanges(person)
             else:
                 self.person = person
+        # Facet builders created from this builder, shared with the facets
+        # themselves so a whole .lives/.works chain reuses the same objects
+        self._facets = {type(self): self}
 
     def __str__(self) -> str:
         return f"\nBuilder({str(self.person)})\n"
 
     @property
     def lives(self) -> "PersonAddressBuilder":
-        return PersonAddressBuilder(self.person)
+        return self._facet(PersonAddressBuilder)
 
     @property
     def works(self) -> "PersonJobBuilder":
-        return PersonJobBuilder(self.person)
+        return self._facet(PersonJobBuilder)
+
+    def _facet(self, facet_type: type["PersonBuilder"]) -> "PersonBuilder":
+        facets = self._facets
+        facet = facets.get(facet_type)
+        if facet is None:
+            facet = facets[facet_type] = facet_type(self.person)
+            facet._facets = facets
+        return facet
+
+    # Points this builder and its facets at another Person, so the
+    # builder can be used again (e.g. from an ObjectPool)
+    def reset(self, person: Person | None = None) -> "PersonBuilder":
+        if person is None:
+            person = Person()
+        # A copy-on-write builder stays copy-on-write, the new person is not
+        # written to either
+        if isinstance(self.person, PersonChanges):
+            person = PersonChanges(person)
+        for builder in self._facets.values():
+            builder.person = person
+        return self
 
     def build(self) -> Person:
+        if isinstance(self.person, PersonChanges):
+            return self.person.materialize()
         return self.person
 
 
@@ -83,96 +193,634 @@ class PersonJobBuilder(PersonBuilder):
         return self
 
 
-pb = PersonBuilder()
-# Below we are using the PersonBuilder facade to set the attributes
-# of a Person object step-by-step. And this is quite easy to read and understand.
-person_a = (
-    pb
-        .lives
-            .at("123 London Road")
-            .in_city("London")
-            .with_postcode("SW12BC")
-        .works
-            .at("Fabrikam")
-            .as_a("Engineer")
-            .earning(123000)
-        .build()
-)
-
-print("Person A:", person_a)
-print()
-
-# When we are using the PersonBuilder facade, we are not directly interacting with
-# the Person class. Instead, we are using the PersonBuilder facade to set the
-# attributes of a Person object step-by-step. So this means we can use lives and works
-# properties repeatedly to create multiple Person objects with different attributes.
-person_b = (
-    pb
-        .works
-            .at("Google")
-            .as_a("Software Engineer")
-            .earning(100000)
-        .build()
-)
-person_c = (
-    pb
-        .lives
-            .at("40710 1st Street")
-            .in_city("New York")
-            .with_postcode("10001")
-        .build()
-)
-
-print("Person B:", person_b)
-print()
-print("Person C:", person_c)
-print()
-
-# We can also make modification to existing person object
-pb = PersonBuilder(person_a)
-person_d = (
-    pb
-        .lives
-            .at("5689 Richmond Road")
-            .in_city("Lisbon")
-            .with_postcode("12345")
-        .build()
-)
-
-print("Person D:", person_d)
-print()
-print("Person A:", person_a)
-print()
-
-# To avoid modifying the original person object, we can use deepcopy
-pb = PersonBuilder(deepcopy(person_a))
-person_e = (
-    pb
-        .lives
-            .at("321 London Road")
-            .in_city("London")
-            .with_postcode("SW12BC")
-        .build()
-)
-
-print("Person E:", person_e)
-print()
-print("Person A:", person_a)
-print()
-
-
-# Or we can use the copy parameter in the PersonBuilder constructor
-pb = PersonBuilder(person_a, copy=True)
-person_f = (
-    pb
-        .lives
-            .at("321 London Road")
-            .in_city("London")
-            .with_postcode("SW12BC")
-        .build()
-)
-
-print("Person F:", person_f)
-print()
-print("Person A:", person_a)
-print()
+"""
+A PersonBuilder can not be shared between threads, because every .lives/.works
+chain writes to the same Person. ConcurrentPersonBuilder gives each chain its
+own staging record instead: a fresh Person, or a PersonChanges on top of the
+template. Chains started from the same builder never see each other's writes,
+and the template is only read. There is no lock, so threads never wait for
+each other.
+
+>>> pb = ConcurrentPersonBuilder(template)
+>>> # safe to run from many threads at once
+>>> pb.lives.at("123 London Road").works.at("Fabrikam").build()
+
+Unlike PersonBuilder, two chains do not add up to one Person: each build()
+returns the Person of its own chain.
+"""
+class ConcurrentPersonBuilder(PersonBuilder):
+    def __init__(self, template: Person | None = None) -> None:
+        self.template = template
+
+    def __str__(self) -> str:
+        return f"\nConcurrentBuilder({str(self.template)})\n"
+
+    def _staging(self) -> Person | PersonChanges:
+        if self.template is None:
+            return Person()
+        return PersonChanges(self.template)
+
+    def _facet(self, facet_type: type[PersonBuilder]) -> PersonBuilder:
+        # Not cached, every chain gets its own facets and staging record
+        return facet_type(self._staging())
+
+    def reset(self, template: Person | None = None) -> "ConcurrentPersonBuilder":
+        self.template = template
+        return self
+
+    def build(self) -> Person:
+        return PersonBuilder(self._staging()).build()
+
+
+"""
+Going through .lives and .works for every record allocates two facet builders
+per Person, which adds up when ingesting millions of records. PersonBatchBuilder
+works out once which facet setter is responsible for which column (the setter
+plan). It then keeps a single facet builder of each kind and just points them at
+the next Person, so every record costs one Person and a few method calls.
+
+Records are either dicts keyed by column name, or rows (tuples/lists) whose
+values are in the order of `columns`. The first record decides which one a
+batch contains.
+"""
+class PersonBatchBuilder:
+    # Person field -> (facet builder, setter name)
+    FACET_SETTERS = {
+        "street_address": (PersonAddressBuilder, "at"),
+        "postcode": (PersonAddressBuilder, "with_postcode"),
+        "city": (PersonAddressBuilder, "in_city"),
+        "company_name": (PersonJobBuilder, "at"),
+        "position": (PersonJobBuilder, "as_a"),
+        "annual_income": (PersonJobBuilder, "earning"),
+    }
+
+    def __init__(self, columns: Sequence[str]) -> None:
+        unknown = [c for c in columns if c not in self.FACET_SETTERS]
+        if unknown:
+            raise ValueError(f"Unknown Person fields: {', '.join(unknown)}")
+        self.columns = tuple(columns)
+        self._facets = {
+            facet: facet(Person())
+            for facet in {facet for facet, _ in self.FACET_SETTERS.values()}
+        }
+        setters = []
+        for column in self.columns:
+            facet, setter = self.FACET_SETTERS[column]
+            setters.append(getattr(self._facets[facet], setter))
+        self._dict_plan = tuple(zip(self.columns, setters))
+        self._row_plan = tuple(enumerate(setters))
+
+    def build(self, record: Mapping[str, Any] | Sequence[Any]) -> Person:
+        return next(self.build_all((record,)))
+
+    def build_all(self, records: Iterable[Mapping[str, Any] | Sequence[Any]]) -> Iterator[Person]:
+        facets = tuple(self._facets.values())
+        plan = None
+        for record in records:
+            if plan is None:
+                plan = self._dict_plan if isinstance(record, Mapping) else self._row_plan
+            person = Person()
+            for facet in facets:
+                facet.person = person
+            for key, setter in plan:
+                setter(record[key])
+            yield person
+
+    def build_columns(self, records: Iterable[Mapping[str, Any] | Sequence[Any]]) -> dict[str, list]:
+        """Collect the records column by column instead of creating Person objects."""
+        columns = {column: [] for column in self.columns}
+        appends = [columns[column].append for column in self.columns]
+        plan = None
+        for record in records:
+            if plan is None:
+                keys = self.columns if isinstance(record, Mapping) else range(len(self.columns))
+                plan = tuple(zip(keys, appends))
+            for key, append in plan:
+                append(record[key])
+        return columns
+
+    def build_parallel(
+        self,
+        records: Iterable[Mapping[str, Any] | Sequence[Any]],
+        processes: int | None = None,
+        chunk_size: int = 10_000,
+    ) -> Iterator[Person]:
+        """Build chunks of records in worker processes, keeping the input order."""
+        # Importing this takes longer than the rest of the module, so only
+        # pay for it when it is used
+        from concurrent.futures import ProcessPoolExecutor
+
+        processes = processes or os.cpu_count() or 1
+        records = iter(records)
+        chunks = iter(lambda: list(islice(records, chunk_size)), [])
+        # executor.map() would read all the records up front. Only keep a couple
+        # of chunks per process in flight, so the input is streamed.
+        pending = deque()
+        with ProcessPoolExecutor(processes) as executor:
+            for chunk in chunks:
+                pending.append(executor.submit(_build_chunk, chunk, self.columns))
+                if len(pending) >= processes * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+
+
+"""
+In hot loops even the Person and PersonBuilder themselves are garbage once the
+Person has been used. ObjectPool keeps released objects and hands them out
+again, calling reset() on them instead of creating new ones. The arguments of
+acquire() go to the constructor for new objects and to reset() for reused
+ones, so Person and PersonBuilder can both be pooled:
+
+>>> person = person_pool.acquire()
+>>> builder = builder_pool.acquire(person)
+>>> builder.lives.at("123 London Road").works.at("Fabrikam").build()
+>>> ...
+>>> builder_pool.release(builder)
+>>> person_pool.release(person)
+"""
+class ObjectPool:
+    def __init__(self, factory: Callable[..., Any], max_size: int = 1024) -> None:
+        self.factory = factory
+        self.max_size = max_size
+        self._free = []
+
+    def __len__(self) -> int:
+        return len(self._free)
+
+    def acquire(self, *args, **kwargs):
+        if self._free:
+            return self._free.pop().reset(*args, **kwargs)
+        return self.factory(*args, **kwargs)
+
+    def release(self, obj) -> None:
+        if len(self._free) < self.max_size:
+            self._free.append(obj)
+
+
+"""
+Both copy=True (a deepcopy per variant) and copy=False (everyone writes to the
+same Person) get in the way when many threads derive variants from one template.
+PersonSnapshot is an immutable Person made of one tuple per facet. Changing a
+field creates a new snapshot that only replaces the facet the field lives in,
+and shares the other facet (and all unchanged values) with the old snapshot.
+Nothing is ever modified, so a template can be shared by any number of threads
+without copies or locks.
+
+The snapshot builders are immutable as well, every step returns a new builder:
+
+>>> template = PersonSnapshotBuilder().lives.in_city("London").build()
+>>> a = PersonSnapshotBuilder(template).works.at("Fabrikam").build()
+>>> b = PersonSnapshotBuilder(template).works.at("Google").build()
+>>> a.address is b.address is template.address
+True
+"""
+class Address(NamedTuple):
+    street_address: str | None = None
+    postcode: str | None = None
+    city: str | None = None
+
+
+class Job(NamedTuple):
+    company_name: str | None = None
+    position: str | None = None
+    annual_income: int | None = None
+
+
+class PersonSnapshot(NamedTuple):
+    address: Address = Address()
+    job: Job = Job()
+
+    def __str__(self) -> str:
+        return str(self.to_person())
+
+    @staticmethod
+    def from_person(person: Person) -> "PersonSnapshot":
+        return PersonSnapshot(
+            Address(person.street_address, person.postcode, person.city),
+            Job(person.company_name, person.position, person.annual_income),
+        )
+
+    def to_person(self) -> Person:
+        person = Person()
+        person.street_address, person.postcode, person.city = self.address
+        person.company_name, person.position, person.annual_income = self.job
+        return person
+
+
+class PersonSnapshotBuilder:
+    __slots__ = ("snapshot",)
+
+    def __init__(self, snapshot: PersonSnapshot | None = None) -> None:
+        self.snapshot = PersonSnapshot() if snapshot is None else snapshot
+
+    def __str__(self) -> str:
+        return f"\nBuilder({str(self.snapshot)})\n"
+
+    @property
+    def lives(self) -> "PersonSnapshotAddressBuilder":
+        return PersonSnapshotAddressBuilder(self.snapshot)
+
+    @property
+    def works(self) -> "PersonSnapshotJobBuilder":
+        return PersonSnapshotJobBuilder(self.snapshot)
+
+    def build(self) -> PersonSnapshot:
+        return self.snapshot
+
+
+class PersonSnapshotAddressBuilder(PersonSnapshotBuilder):
+    __slots__ = ()
+
+    def _with(self, address: Address) -> "PersonSnapshotAddressBuilder":
+        return PersonSnapshotAddressBuilder(PersonSnapshot(address, self.snapshot.job))
+
+    def at(self, street_address: str) -> "PersonSnapshotAddressBuilder":
+        _, postcode, city = self.snapshot.address
+        return self._with(Address(street_address, postcode, city))
+
+    def with_postcode(self, postcode: str) -> "PersonSnapshotAddressBuilder":
+        street_address, _, city = self.snapshot.address
+        return self._with(Address(street_address, postcode, city))
+
+    def in_city(self, city: str) -> "PersonSnapshotAddressBuilder":
+        street_address, postcode, _ = self.snapshot.address
+        return self._with(Address(street_address, postcode, city))
+
+
+class PersonSnapshotJobBuilder(PersonSnapshotBuilder):
+    __slots__ = ()
+
+    def _with(self, job: Job) -> "PersonSnapshotJobBuilder":
+        return PersonSnapshotJobBuilder(PersonSnapshot(self.snapshot.address, job))
+
+    def at(self, company_name: str) -> "PersonSnapshotJobBuilder":
+        _, position, annual_income = self.snapshot.job
+        return self._with(Job(company_name, position, annual_income))
+
+    def as_a(self, position: str) -> "PersonSnapshotJobBuilder":
+        company_name, _, annual_income = self.snapshot.job
+        return self._with(Job(company_name, position, annual_income))
+
+    def earning(self, annual_income: int) -> "PersonSnapshotJobBuilder":
+        company_name, position, _ = self.snapshot.job
+        return self._with(Job(company_name, position, annual_income))
+
+
+"""
+Person.__str__ is only meant for reading, it can not be parsed back. PersonRecords
+stores people in a binary file instead, in the layout of snapshot_file.py: a
+versioned header, one fixed width record per person with the five text fields
+as uint32 indexes into the string table (0 is None, 1 is the first text) and
+annual_income as int64, and a string table with every distinct text once.
+
+Cities, companies and positions repeat a lot, so storing every distinct text
+once keeps the file small. Opening the file maps it with mmap and only reads
+the header. A Person is only built when it is accessed, and where() compares
+the string indexes in the raw records, so finding everyone in a city never
+decodes a single record that does not match.
+
+>>> PersonRecords.save(people, "people.bin")
+>>> with PersonRecords("people.bin") as records:
+...     londoners = list(records.where(city="London"))
+"""
+@cache
+def _snapshot_file():
+    # The file layout is shared with SOLID/O.py and lives in that package. When
+    # this file is run as a script SOLID is not importable, so load it by path.
+    try:
+        from SOLID import snapshot_file
+    except ImportError:
+        from importlib.util import module_from_spec, spec_from_file_location
+        spec = spec_from_file_location("snapshot_file", Path(__file__).resolve().parent.parent / "SOLID" / "snapshot_file.py")
+        snapshot_file = module_from_spec(spec)
+        spec.loader.exec_module(snapshot_file)
+    return snapshot_file
+
+
+class PersonRecords:
+    MAGIC = b"PREC"
+    VERSION = 1
+    TEXT_FIELDS = ("street_address", "postcode", "city", "company_name", "position")
+    RECORD = struct.Struct("<5Iq")
+    # annual_income can be None, which is stored as the smallest int64
+    NO_INCOME = -(1 << 63)
+
+    def __init__(self, filepath) -> None:
+        self._file = _snapshot_file().SnapshotFile(filepath, self.MAGIC, self.VERSION, self.RECORD, "person records file")
+        self._records = self._file.records
+        self._count = self._file.count
+
+    def __enter__(self) -> "PersonRecords":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> Person:
+        if not -self._count <= index < self._count:
+            raise IndexError("person index out of range")
+        return self._person(self.RECORD.unpack_from(self._records, index % self._count * self.RECORD.size))
+
+    def __iter__(self) -> Iterator[Person]:
+        return map(self._person, self.RECORD.iter_unpack(self._records))
+
+    def _person(self, record: tuple) -> Person:
+        person = Person()
+        for name, index in zip(self.TEXT_FIELDS, record):
+            setattr(person, name, None if index == 0 else self._file.text(index - 1))
+        income = record[-1]
+        person.annual_income = None if income == self.NO_INCOME else income
+        return person
+
+    def _index_of(self, text: str | None) -> int | None:
+        """The index of text as stored in the records, or None if no record uses it."""
+        if text is None:
+            return 0
+        index = self._file.find(text)
+        return None if index is None else index + 1
+
+    def where(self, **values: Any) -> Iterator[Person]:
+        """The people whose fields have the given values, e.g. where(city="London")."""
+        for index in self.matching(**values):
+            yield self[index]
+
+    def matching(self, **values: Any) -> Iterator[int]:
+        checks = []
+        for name, value in values.items():
+            if name == "annual_income":
+                checks.append((len(self.TEXT_FIELDS), self.NO_INCOME if value is None else value))
+            elif name in self.TEXT_FIELDS:
+                index = self._index_of(value)
+                if index is None:
+                    return
+                checks.append((self.TEXT_FIELDS.index(name), index))
+            else:
+                raise ValueError(f"Person has no field {name!r}")
+        if not checks:
+            yield from range(self._count)
+            return
+        # itemgetter returns one value for one field and a tuple for more
+        fields = itemgetter(*(position for position, _ in checks))
+        wanted = checks[0][1] if len(checks) == 1 else tuple(value for _, value in checks)
+        records = map(fields, self.RECORD.iter_unpack(self._records))
+        # eq and not wanted.__eq__, which returns NotImplemented (truthy) when
+        # e.g. annual_income is compared with a str
+        yield from compress(range(self._count), map(eq, repeat(wanted), records))
+
+    @staticmethod
+    def save(people: Iterable[Person], filepath) -> int:
+        """Writes the people to filepath and returns how many there were."""
+        cls = PersonRecords
+        with _snapshot_file().SnapshotWriter(filepath, cls.MAGIC, cls.VERSION, cls.RECORD) as writer:
+            for person in people:
+                income = person.annual_income
+                writer.add(
+                    *(cls._text_index(writer, person, name) for name in cls.TEXT_FIELDS),
+                    cls.NO_INCOME if income is None else income,
+                )
+        return writer.count
+
+    @staticmethod
+    def _text_index(writer: "SnapshotWriter", person: Person, name: str) -> int:
+        value = getattr(person, name)
+        if value is None:
+            return 0
+        # Anything else would come back as a str, and not be found by where()
+        if not isinstance(value, str):
+            raise TypeError(f"{name} has to be a str or None to be saved, not {type(value).__name__}")
+        return writer.text(value) + 1
+
+
+# Module level so it can be pickled and sent to the worker processes
+def _build_chunk(records: list, columns: tuple[str, ...]) -> list[Person]:
+    return list(PersonBatchBuilder(columns).build_all(records))
+
+
+if __name__ == "__main__":
+    pb = PersonBuilder()
+    # Below we are using the PersonBuilder facade to set the attributes
+    # of a Person object step-by-step. And this is quite easy to read and understand.
+    person_a = (
+        pb
+            .lives
+                .at("123 London Road")
+                .in_city("London")
+                .with_postcode("SW12BC")
+            .works
+                .at("Fabrikam")
+                .as_a("Engineer")
+                .earning(123000)
+            .build()
+    )
+
+    print("Person A:", person_a)
+    print()
+
+    # When we are using the PersonBuilder facade, we are not directly interacting with
+    # the Person class. Instead, we are using the PersonBuilder facade to set the
+    # attributes of a Person object step-by-step. So this means we can use lives and works
+    # properties repeatedly to create multiple Person objects with different attributes.
+    person_b = (
+        pb
+            .works
+                .at("Google")
+                .as_a("Software Engineer")
+                .earning(100000)
+            .build()
+    )
+    person_c = (
+        pb
+            .lives
+                .at("40710 1st Street")
+                .in_city("New York")
+                .with_postcode("10001")
+            .build()
+    )
+
+    print("Person B:", person_b)
+    print()
+    print("Person C:", person_c)
+    print()
+
+    # We can also make modification to existing person object
+    pb = PersonBuilder(person_a)
+    person_d = (
+        pb
+            .lives
+                .at("5689 Richmond Road")
+                .in_city("Lisbon")
+                .with_postcode("12345")
+            .build()
+    )
+
+    print("Person D:", person_d)
+    print()
+    print("Person A:", person_a)
+    print()
+
+    # To avoid modifying the original person object, we can use deepcopy
+    pb = PersonBuilder(deepcopy(person_a))
+    person_e = (
+        pb
+            .lives
+                .at("321 London Road")
+                .in_city("London")
+                .with_postcode("SW12BC")
+            .build()
+    )
+
+    print("Person E:", person_e)
+    print()
+    print("Person A:", person_a)
+    print()
+
+
+    # Or we can use the copy parameter in the PersonBuilder constructor
+    pb = PersonBuilder(person_a, copy=True)
+    person_f = (
+        pb
+            .lives
+                .at("321 London Road")
+                .in_city("London")
+                .with_postcode("SW12BC")
+            .build()
+    )
+
+    print("Person F:", person_f)
+    print()
+    print("Person A:", person_a)
+    print()
+
+
+    # Or we can use copy on write, which shares person_a and only records the changes
+    pb = PersonBuilder(person_a, copy_on_write=True)
+    person_g = (
+        pb
+            .lives
+                .at("99 Oxford Street")
+            .build()
+    )
+
+    print("Person G:", person_g)
+    print()
+    print("Person A:", person_a)
+    print()
+
+    # Derive variants from a template with the generic deepcopy (how copy=True
+    # used to work), with Person.__deepcopy__ and with copy on write.
+    from timeit import timeit
+
+    # Setting __deepcopy__ to None makes deepcopy fall back to the generic path
+    class GenericCopyPerson(Person):
+        __deepcopy__ = None
+
+    generic_template = GenericCopyPerson()
+    generic_template.__dict__.update(person_a.__dict__)
+
+    def derive(template, **builder_options):
+        return (
+            PersonBuilder(template, **builder_options)
+                .lives
+                    .at("1 Main Street")
+                .works
+                    .earning(1)
+                .build()
+        )
+
+    records = [
+        ("123 London Road", "SW12BC", "London", "Fabrikam", "Engineer", 123000),
+    ] * 100_000
+    columns = ("street_address", "postcode", "city", "company_name", "position", "annual_income")
+
+    def build_with_facets():
+        for street_address, postcode, city, company_name, position, annual_income in records:
+            (
+                PersonBuilder()
+                    .lives
+                        .at(street_address)
+                        .with_postcode(postcode)
+                        .in_city(city)
+                    .works
+                        .at(company_name)
+                        .as_a(position)
+                        .earning(annual_income)
+                    .build()
+            )
+
+    print(f"Building {len(records)} people from rows:")
+    print(f" - facets:        {timeit(build_with_facets, number=1):.3f}s")
+    print(f" - batch builder: {timeit(lambda: list(PersonBatchBuilder(columns).build_all(records)), number=1):.3f}s")
+    print()
+
+    n = 100_000
+    print(f"Deriving {n} variants:")
+    print(f" - generic deepcopy:     {timeit(lambda: derive(generic_template, copy=True), number=n):.3f}s")
+    print(f" - Person.__deepcopy__:  {timeit(lambda: derive(person_a, copy=True), number=n):.3f}s")
+    print(f" - copy on write:        {timeit(lambda: derive(person_a, copy_on_write=True), number=n):.3f}s")
+
+    # Derive variants that change one field from a shared template: deepcopy
+    # per variant, the mutable shared Person, and immutable snapshots.
+    snapshot_a = PersonSnapshot.from_person(person_a)
+    print()
+    print(f"Deriving {n} variants that move to another city:")
+    print(f" - deepcopy:  {timeit(lambda: PersonBuilder(person_a, copy=True).lives.in_city('Paris').build(), number=n):.3f}s")
+    print(f" - mutable:   {timeit(lambda: PersonBuilder(person_a).lives.in_city('Paris').build(), number=n):.3f}s")
+    print(f" - snapshots: {timeit(lambda: PersonSnapshotBuilder(snapshot_a).lives.in_city('Paris').build(), number=n):.3f}s")
+
+    # Save people in the binary records format, open the file again and find
+    # the people in one city without building everyone
+    import tempfile
+
+    cities = ("London", "Paris", "Berlin", "Madrid")
+    people = (
+        PersonBuilder().lives.at(f"{i} Main Street").in_city(cities[i % 4]).works.at(f"Company {i % 100}").earning(i).build()
+        for i in range(n)
+    )
+    filepath = os.path.join(tempfile.mkdtemp(), "people.bin")
+    saved = PersonRecords.save(people, filepath)
+    print()
+    print(f"Person records for {saved} people, {os.path.getsize(filepath) / saved:.1f} bytes per person:")
+    with PersonRecords(filepath) as people_records:
+        print(f" - open:            {timeit(lambda: PersonRecords(filepath).close(), number=1):.6f}s")
+        print(f" - where(city=...): {timeit(lambda: list(people_records.where(city='Paris')), number=1):.3f}s")
+        print(f" - all records:     {timeit(lambda: [p for p in people_records if p.city == 'Paris'], number=1):.3f}s")
+    os.remove(filepath)
+
+    # Count the Person and builder objects created while building people with
+    # a new builder every time, and with pooled people and builders. This
+    # replaces __new__ for good, so it has to run last.
+    from collections import Counter
+
+    allocations = Counter()
+
+    def counting_new(cls, *args, **kwargs):
+        allocations[cls.__name__] += 1
+        return object.__new__(cls)
+
+    Person.__new__ = PersonBuilder.__new__ = staticmethod(counting_new)
+
+    def build_new(n):
+        for _ in range(n):
+            person = PersonBuilder().lives.at("1 Main Street").works.at("Fabrikam").build()
+
+    def build_pooled(n):
+        person_pool, builder_pool = ObjectPool(Person), ObjectPool(PersonBuilder)
+        for _ in range(n):
+            person = person_pool.acquire()
+            builder = builder_pool.acquire(person)
+            builder.lives.at("1 Main Street").works.at("Fabrikam").build()
+            builder_pool.release(builder)
+            person_pool.release(person)
+
+    print()
+    for build in (build_new, build_pooled):
+        allocations.clear()
+        build(10_000)
+        print(f"Objects allocated for 10000 people ({build.__name__}): {dict(allocations)}")
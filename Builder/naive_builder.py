@@ -5,15 +5,16 @@ This example is not very good, but it shows the basic idea
 of when builder pattern can be useful.
 """
 
-text = 'hello'
-parts = ['<p>', text, '</p>']
-print(''.join(parts))
+if __name__ == '__main__':
+	text = 'hello'
+	parts = ['<p>', text, '</p>']
+	print(''.join(parts))
 
 
-# now, imagine you want to build a list with 50 items
-words = ['hello', 'world'] * 25
-parts = ['<ul>']
-for w in words:
-	parts.append(f'  <li>{w}</li>')
-parts.append('</ul>')
-print('\n'.join(parts))
+	# now, imagine you want to build a list with 50 items
+	words = ['hello', 'world'] * 25
+	parts = ['<ul>']
+	for w in words:
+		parts.append(f'  <li>{w}</li>')
+	parts.append('</ul>')
+	print('\n'.join(parts))
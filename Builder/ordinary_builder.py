@@ -3,17 +3,46 @@ Builder is a creational design pattern that lets you construct complex objects s
 
 When piecewise object construction is complicated, provide an API for doing it succinctly.
 """
+import sys
+from html.parser import HTMLParser
 
 
-
+"""
+Generated documents can contain millions of elements, most of them leaves like
+<li> or <td> that never get any children. So HtmlElement is written as a
+flyweight:
+    1. __slots__ removes the per-instance __dict__.
+    2. Tag names are interned, so every <li> shares one 'li' string.
+    3. Leaves share the empty NO_ELEMENTS tuple instead of owning an empty list.
+       A real list is only allocated once the first child is added.
+"""
 class HtmlElement:
+    __slots__ = ('name', 'text', '_elements')
+
     indent_size = 2
+    NO_ELEMENTS = ()
 
     def __init__(self, name="", text=""):
-        self.name = name
+        # Only str can be interned, anything else is kept as it is
+        self.name = sys.intern(name) if isinstance(name, str) else name
         self.text = text
-        self.elements = []
-    
+        self._elements = HtmlElement.NO_ELEMENTS
+
+    @property
+    def elements(self):
+        # Callers may append to the returned list, so a leaf has to
+        # get its own list before we hand it out.
+        if self._elements is HtmlElement.NO_ELEMENTS:
+            self._elements = []
+        return self._elements
+
+    def add_element(self, element):
+        if self._elements is HtmlElement.NO_ELEMENTS:
+            self._elements = [element]
+        else:
+            self._elements.append(element)
+        return element
+
     def __str__(self):
         return self.__str(0)
 
@@ -28,7 +57,7 @@ class HtmlElement:
             lines.append(f'{indentation} {self.text}')
         
         # Child Elements
-        for element in self.elements:
+        for element in self._elements:
             lines.append(element.__str(indent + 1))
 
         # Closing tag
@@ -67,40 +96,197 @@ class HtmlBuilder:
     
     # Not fluent, this does not allow us to chain methods
     def add_child(self, child_name, child_text):
-        self.__root.elements.append(
+        self.__root.add_element(
             HtmlElement(child_name, child_text)
         )
     
     # Fluent, this allows us to chain methods
     def add_child_fluent(self, child_name, child_text):
-        self.__root.elements.append(
+        self.__root.add_element(
             HtmlElement(child_name, child_text)
         )
         return self
-    
 
-# Non-fluent builder
-builder_not_fluent = HtmlBuilder('ul')
-builder_not_fluent.add_child('li', 'hello')
-builder_not_fluent.add_child('li', 'world')
-print('Ordinary builder:')
-print(builder_not_fluent)
-
-# Fluent builder
-builder_fluent = HtmlBuilder('ul')
-builder_fluent \
-    .add_child_fluent('li', 'hello') \
-    .add_child_fluent('li', 'world')
-print()
-print('Fluent builder:')
-print(builder_fluent)
-
-
-# This is a better way to create HtmlElement with fluent builder
-builder = HtmlElement.create('ul')
-builder \
-    .add_child_fluent('li', 'hello') \
-    .add_child_fluent('li', 'world')
-print()
-print('Better way to create an HtmlElement object:')
-print(builder)
+    # Start from an existing page instead of an empty root element
+    @staticmethod
+    def from_file(filepath):
+        root = HtmlLoader.load_from_file(filepath)
+        builder = HtmlBuilder(root.name)
+        builder.__root = root
+        return builder
+
+
+"""
+So far HtmlElement trees could only be built by hand. HtmlElementParser goes the
+other way and turns existing markup into HtmlElement trees, so archived pages
+can be loaded and then changed through the builder.
+
+The parser is fed chunk by chunk, so a page is never held in memory as a
+string. When emit_depth is given, every element at that depth is detached from
+its parent and handed out as soon as its closing tag is seen. Memory then
+stays bounded by the largest subtree instead of the whole document. For example
+emit_depth=1 yields the children of the root element one at a time.
+
+Note: HtmlElement has no attributes, so tag attributes are dropped.
+"""
+class HtmlElementParser(HTMLParser):
+    # Elements that never have a closing tag
+    VOID_ELEMENTS = frozenset({
+        'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+        'link', 'meta', 'source', 'track', 'wbr',
+    })
+
+    # Elements whose end tag is optional are closed by certain start tags:
+    # tag -> (open elements it closes, open elements that stop the search).
+    # So the second <li> in <ul><li>a<li>b</ul> closes the first one, but an
+    # <li> of a nested list does not close the item the list is in.
+    _P_SCOPE = frozenset({'button', 'caption', 'object', 'table', 'td', 'template', 'th'})
+    IMPLIED_END_TAGS = {
+        'li': (frozenset({'li'}), frozenset({'menu', 'ol', 'ul'})),
+        'dt': (frozenset({'dd', 'dt'}), frozenset({'dl'})),
+        'dd': (frozenset({'dd', 'dt'}), frozenset({'dl'})),
+        'tr': (frozenset({'tr'}), frozenset({'table', 'tbody', 'tfoot', 'thead'})),
+        'td': (frozenset({'td', 'th'}), frozenset({'table', 'tr'})),
+        'th': (frozenset({'td', 'th'}), frozenset({'table', 'tr'})),
+        'thead': (frozenset({'tbody', 'tfoot', 'thead'}), frozenset({'table'})),
+        'tbody': (frozenset({'tbody', 'tfoot', 'thead'}), frozenset({'table'})),
+        'tfoot': (frozenset({'tbody', 'tfoot', 'thead'}), frozenset({'table'})),
+        'option': (frozenset({'option'}), frozenset({'optgroup', 'select'})),
+        'optgroup': (frozenset({'optgroup', 'option'}), frozenset({'select'})),
+        'rp': (frozenset({'rp', 'rt'}), frozenset({'ruby'})),
+        'rt': (frozenset({'rp', 'rt'}), frozenset({'ruby'})),
+        # Block elements end an open paragraph
+        **dict.fromkeys(
+            (
+                'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl',
+                'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2',
+                'h3', 'h4', 'h5', 'h6', 'header', 'hgroup', 'hr', 'main', 'menu',
+                'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul',
+            ),
+            (frozenset({'p'}), _P_SCOPE),
+        ),
+    }
+
+    def __init__(self, emit_depth=None):
+        super().__init__(convert_charrefs=True)
+        self.emit_depth = emit_depth
+        self._open = []
+        self._completed = []
+
+    def handle_starttag(self, tag, attrs):
+        implied = self.IMPLIED_END_TAGS.get(tag)
+        if implied is not None:
+            self._close_implied(*implied)
+        element = HtmlElement(tag)
+        if tag in self.VOID_ELEMENTS:
+            self._close(element)
+        else:
+            self._open.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self._close(HtmlElement(tag))
+
+    def handle_endtag(self, tag):
+        # Tolerate sloppy markup: a closing tag also closes any
+        # unclosed elements nested inside it. Stray closing tags are ignored.
+        for i in range(len(self._open) - 1, -1, -1):
+            if self._open[i].name == tag:
+                while len(self._open) > i:
+                    self._close(self._open.pop())
+                return
+
+    def _close_implied(self, closes, stops):
+        for i in range(len(self._open) - 1, -1, -1):
+            name = self._open[i].name
+            if name in closes:
+                while len(self._open) > i:
+                    self._close(self._open.pop())
+                return
+            if name in stops:
+                return
+
+    def handle_data(self, data):
+        text = ' '.join(data.split())
+        if text and self._open:
+            element = self._open[-1]
+            element.text = f'{element.text} {text}' if element.text else text
+
+    def close(self):
+        super().close()
+        while self._open:
+            self._close(self._open.pop())
+
+    def _close(self, element):
+        depth = len(self._open)
+        if self.emit_depth is None:
+            if depth:
+                self._open[-1].add_element(element)
+            else:
+                self._completed.append(element)
+        elif depth == self.emit_depth:
+            self._completed.append(element)
+        elif depth > self.emit_depth:
+            self._open[-1].add_element(element)
+
+    def completed(self):
+        """Hand out the elements finished so far and forget about them."""
+        completed, self._completed = self._completed, []
+        return completed
+
+
+class HtmlLoader:
+    chunk_size = 64 * 1024
+
+    @staticmethod
+    def iter_from_file(filepath, emit_depth=None):
+        parser = HtmlElementParser(emit_depth)
+        with open(filepath) as f:
+            for chunk in iter(lambda: f.read(HtmlLoader.chunk_size), ''):
+                parser.feed(chunk)
+                yield from parser.completed()
+        parser.close()
+        yield from parser.completed()
+
+    @staticmethod
+    def load_from_file(filepath):
+        """The single top-level element of the file. Fragments with more go through iter_from_file()."""
+        elements = HtmlLoader.iter_from_file(filepath)
+        try:
+            root = next(elements, None)
+            if root is None:
+                raise ValueError(f'No HTML elements found in {filepath}')
+            if next(elements, None) is not None:
+                raise ValueError(
+                    f'{filepath} has more than one top-level element, use iter_from_file() to read them all'
+                )
+            return root
+        finally:
+            elements.close()
+
+
+if __name__ == '__main__':
+    # Non-fluent builder
+    builder_not_fluent = HtmlBuilder('ul')
+    builder_not_fluent.add_child('li', 'hello')
+    builder_not_fluent.add_child('li', 'world')
+    print('Ordinary builder:')
+    print(builder_not_fluent)
+
+    # Fluent builder
+    builder_fluent = HtmlBuilder('ul')
+    builder_fluent \
+        .add_child_fluent('li', 'hello') \
+        .add_child_fluent('li', 'world')
+    print()
+    print('Fluent builder:')
+    print(builder_fluent)
+
+
+    # This is a better way to create HtmlElement with fluent builder
+    builder = HtmlElement.create('ul')
+    builder \
+        .add_child_fluent('li', 'hello') \
+        .add_child_fluent('li', 'world')
+    print()
+    print('Better way to create an HtmlElement object:')
+    print(builder)
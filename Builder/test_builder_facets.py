@@ -0,0 +1,62 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
+from unittest import TestCase
+
+from Builder.builder_facets import ConcurrentPersonBuilder, Person, PersonBuilder, PersonRecords
+
+
+class BuilderFacetsTest(TestCase):
+    def test_concurrent_builds_do_not_cross(self):
+        # Many threads build people from one shared builder, and every person
+        # has to end up with the fields of its own chain
+        template = PersonBuilder().lives.in_city("London").works.as_a("Engineer").build()
+        shared_builder = ConcurrentPersonBuilder(template)
+
+        def build_numbered(i):
+            return i, (
+                shared_builder
+                    .lives
+                        .at(f"{i} Main Street")
+                    .works
+                        .at(f"Company {i}")
+                        .earning(i)
+                    .build()
+            )
+
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            people = list(executor.map(build_numbered, range(20_000)))
+        crossed = [
+            i for i, person in people
+            if person.street_address != f"{i} Main Street"
+            or person.company_name != f"Company {i}"
+            or person.annual_income != i
+            or (person.city, person.position) != ("London", "Engineer")
+        ]
+        self.assertEqual(crossed, [])
+        self.assertEqual((template.street_address, template.company_name), (None, None))
+
+    def test_copy_keeps_copy_on_write_changes(self):
+        template = PersonBuilder().lives.in_city("London").build()
+        changes = PersonBuilder(template, copy_on_write=True).lives.at("1 Main Street").person
+        for person in (copy(changes), deepcopy(changes), PersonBuilder(changes, copy=True).person):
+            self.assertIs(type(person), Person)
+            self.assertEqual((person.street_address, person.city), ("1 Main Street", "London"))
+        self.assertIsNone(template.street_address)
+
+
+    def test_where(self):
+        people = [
+            PersonBuilder().lives.in_city("London").works.earning(5).build(),
+            PersonBuilder().lives.in_city("Paris").build(),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "people.bin")
+            PersonRecords.save(people, filepath)
+            with PersonRecords(filepath) as records:
+                self.assertEqual(list(records.matching(city="Paris")), [1])
+                self.assertEqual(list(records.matching(annual_income=5)), [0])
+                self.assertEqual(list(records.matching(annual_income="5")), [])
+                self.assertEqual(list(records.matching(city="Berlin")), [])
+                self.assertEqual(list(records.matching(city="London", annual_income=None)), [])
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from Builder.ordinary_builder import HtmlElementParser
+
+
+def parse(markup, emit_depth=None):
+    parser = HtmlElementParser(emit_depth)
+    parser.feed(markup)
+    parser.close()
+    return parser.completed()
+
+
+def names(elements):
+    return [element.name for element in elements]
+
+
+class HtmlElementParserTest(TestCase):
+    def test_implied_end_tags(self):
+        ul, = parse('<ul><li>a<li>b</ul>')
+        self.assertEqual(names(ul.elements), ['li', 'li'])
+        self.assertEqual([li.text for li in ul.elements], ['a', 'b'])
+
+        table, = parse('<table><tr><td>a<td>b<tr><td>c</table>')
+        self.assertEqual(names(table.elements), ['tr', 'tr'])
+        self.assertEqual(names(table.elements[0].elements), ['td', 'td'])
+
+        div, = parse('<div><p>a<p>b<ul><li>c</ul></div>')
+        self.assertEqual(names(div.elements), ['p', 'p', 'ul'])
+
+    def test_nested_list_items(self):
+        # The <li> of the inner list does not close the outer item
+        ul, = parse('<ul><li>a<ul><li>b<li>c</ul><li>d</ul>')
+        self.assertEqual(names(ul.elements), ['li', 'li'])
+        self.assertEqual(names(ul.elements[0].elements[0].elements), ['li', 'li'])
+
+    def test_many_unclosed_items(self):
+        ul, = parse('<ul>' + '<li>item' * 3000 + '</ul>')
+        self.assertEqual(len(ul.elements), 3000)
+        items = parse('<html><body><ul>' + '<li>item' * 5 + '</ul></body></html>', emit_depth=3)
+        self.assertEqual(names(items), ['li'] * 5)
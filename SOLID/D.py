@@ -56,20 +56,21 @@ class Research:
 				print(f'John has a child called {r[2].name}.')
 
 
-# Here we are creating a list of people.
-parent = Person('John')
-child1 = Person('Chris')
-child2 = Person('Matt')
+if __name__ == '__main__':
+	# Here we are creating a list of people.
+	parent = Person('John')
+	child1 = Person('Chris')
+	child2 = Person('Matt')
 
-# Here we are creating a Relationships object and adding the relationships
-# to it.
-relationships = Relationships()
-relationships.add_parent_and_child(parent, child1)
-relationships.add_parent_and_child(parent, child2)
+	# Here we are creating a Relationships object and adding the relationships
+	# to it.
+	relationships = Relationships()
+	relationships.add_parent_and_child(parent, child1)
+	relationships.add_parent_and_child(parent, child2)
 
-# Here we are creating a Research object and passing the Relationships object
-# to it.
-Research(relationships)
+	# Here we are creating a Research object and passing the Relationships object
+	# to it.
+	Research(relationships)
 
 
 
@@ -120,18 +121,19 @@ class BetterResearch:
 			print(f'John has a child called {p}.')
 
 
-# Here we are creating a list of people.
-parent = Person('John')
-child1 = Person('Chris')
-child2 = Person('Matt')
+if __name__ == '__main__':
+	# Here we are creating a list of people.
+	parent = Person('John')
+	child1 = Person('Chris')
+	child2 = Person('Matt')
 
-# Here we are creating a BetterRelationships object and adding the relationships
-# to it.
-relationships = BetterRelationships()
-relationships.add_parent_and_child(parent, child1)
-relationships.add_parent_and_child(parent, child2)
+	# Here we are creating a BetterRelationships object and adding the relationships
+	# to it.
+	relationships = BetterRelationships()
+	relationships.add_parent_and_child(parent, child1)
+	relationships.add_parent_and_child(parent, child2)
 
-# Here we are creating a BetterResearch object and passing the BetterRelationships
-# object to it.
-BetterResearch(relationships)
+	# Here we are creating a BetterResearch object and passing the BetterRelationships
+	# object to it.
+	BetterResearch(relationships)
 
@@ -105,3 +105,439 @@ class ModernPrinter(PrinterInterface, ScannerInterface, FaxInterface):
 
 	def fax(self, document):
 		print(document)
+
+
+"""
+Because the interfaces are segregated, a dispatcher only has to know which of
+them a device implements to know what it can be used for. DeviceDispatcher
+drives many devices at once with asyncio:
+	1. Every device gets a queue per capability (print, scan, fax) and a number
+	   of workers per capability, so a slow fax does not hold up printing.
+	2. The interface methods are blocking, so they run in worker threads.
+	3. Small text documents waiting in the same queue are joined and sent to the
+	   device in a single call.
+	4. Jobs can be cancelled while they are waiting in a queue.
+	5. stats() reports queue depth and latency per capability.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+
+CAPABILITIES = {
+	'print': PrinterInterface,
+	'scan': ScannerInterface,
+	'fax': FaxInterface,
+}
+
+
+"""
+Checking a device against the interfaces goes through the ABC machinery
+(isinstance -> __instancecheck__ -> __subclasscheck__) every time. The answer
+only depends on the class of the device, so it is worked out once per class.
+"""
+_class_capabilities = {}
+
+
+def capabilities_of(device):
+	device_type = type(device)
+	capabilities = _class_capabilities.get(device_type)
+	if capabilities is None:
+		capabilities = _class_capabilities[device_type] = frozenset(
+			capability for capability, interface in CAPABILITIES.items()
+			if issubclass(device_type, interface)
+		)
+	return capabilities
+
+
+"""
+DeviceRegistry indexes devices by capability when they are registered, so
+finding a device that can fax does not mean checking every device. Jobs are
+spread over the capable devices either round robin or to the least loaded
+device. acquire() counts a job against the device until release() is called.
+
+For least loaded routing the devices of a capability are kept in buckets by
+their load, and the lowest non-empty bucket is tracked. Picking a device and
+moving it to the next bucket are both O(1).
+"""
+class DeviceRegistry:
+	ROUND_ROBIN = 'round_robin'
+	LEAST_LOADED = 'least_loaded'
+
+	def __init__(self, strategy=ROUND_ROBIN):
+		if strategy not in (self.ROUND_ROBIN, self.LEAST_LOADED):
+			raise ValueError(f'Unknown strategy: {strategy}')
+		self.strategy = strategy
+		self.load = {}  # device -> jobs acquired and not yet released
+		self._devices = {capability: [] for capability in CAPABILITIES}
+		self._next = {capability: 0 for capability in CAPABILITIES}
+		# capability -> {load: {device: None}}, dicts used as ordered sets
+		self._buckets = {capability: {} for capability in CAPABILITIES}
+		self._min_load = {capability: 0 for capability in CAPABILITIES}
+
+	def __len__(self):
+		return len(self.load)
+
+	def devices(self, capability):
+		return list(self._devices[capability])
+
+	def register(self, device):
+		if device in self.load:
+			return
+		self.load[device] = 0
+		for capability in capabilities_of(device):
+			self._devices[capability].append(device)
+			self._buckets[capability].setdefault(0, {})[device] = None
+			self._min_load[capability] = 0
+
+	def unregister(self, device):
+		load = self.load.pop(device)
+		for capability in capabilities_of(device):
+			self._devices[capability].remove(device)
+			self._remove(capability, device, load)
+			if self._devices[capability]:
+				self._update_min_load(capability)
+
+	def acquire(self, capability):
+		devices = self._devices[capability]
+		if not devices:
+			raise LookupError(f'No registered device can {capability}')
+		if self.strategy == self.ROUND_ROBIN:
+			i = self._next[capability] % len(devices)
+			self._next[capability] = i + 1
+			device = devices[i]
+		else:
+			device = next(iter(self._buckets[capability][self._min_load[capability]]))
+		self._move(device, +1)
+		return device
+
+	def release(self, device):
+		if self.load.get(device, 0) > 0:
+			self._move(device, -1)
+
+	def _move(self, device, change):
+		load = self.load[device]
+		self.load[device] = load + change
+		for capability in capabilities_of(device):
+			self._remove(capability, device, load)
+			self._buckets[capability].setdefault(load + change, {})[device] = None
+			if load + change < self._min_load[capability]:
+				self._min_load[capability] = load + change
+			elif load == self._min_load[capability] and load not in self._buckets[capability]:
+				self._min_load[capability] = load + change
+
+	def _remove(self, capability, device, load):
+		bucket = self._buckets[capability][load]
+		del bucket[device]
+		if not bucket:
+			del self._buckets[capability][load]
+
+	def _update_min_load(self, capability):
+		self._min_load[capability] = min(self._buckets[capability])
+
+
+@dataclass
+class Job:
+	capability: str
+	document: object
+	future: asyncio.Future
+	submitted_at: float = field(default_factory=time.perf_counter)
+
+
+@dataclass
+class LatencyStats:
+	jobs: int = 0
+	total: float = 0.0
+	max: float = 0.0
+
+	@property
+	def average(self):
+		return self.total / self.jobs if self.jobs else 0.0
+
+	def add(self, latency):
+		self.jobs += 1
+		self.total += latency
+		self.max = max(self.max, latency)
+
+
+class DeviceDispatcher:
+	def __init__(self, concurrency=None, max_batch=16, small_document_size=1024, registry=None):
+		# Number of workers per device for each capability, 1 if not given
+		self.concurrency = concurrency or {}
+		self.max_batch = max_batch
+		self.small_document_size = small_document_size
+		self.queues = {}  # (device, capability) -> asyncio.Queue
+		self.latency = {capability: LatencyStats() for capability in CAPABILITIES}
+		self.registry = registry or DeviceRegistry()
+		self._workers = []
+		self._closed = False
+
+	def add_device(self, device):
+		"""Must be called from a running event loop."""
+		self.registry.register(device)
+		for capability in capabilities_of(device):
+			queue = self.queues[device, capability] = asyncio.Queue()
+			for _ in range(self.concurrency.get(capability, 1)):
+				self._workers.append(asyncio.create_task(
+					self._work(device, capability, queue)
+				))
+
+	def submit(self, device, capability, document):
+		"""Queues a job and returns a future for the device's result. Cancel the future to cancel the job."""
+		if self._closed:
+			raise RuntimeError('DeviceDispatcher is closed')
+		try:
+			queue = self.queues[device, capability]
+		except KeyError:
+			raise ValueError(f'{type(device).__name__} can not {capability} or was not added') from None
+		job = Job(capability, document, asyncio.get_running_loop().create_future())
+		queue.put_nowait(job)
+		return job.future
+
+	def dispatch(self, capability, document):
+		"""Like submit(), but lets the registry pick a capable device."""
+		device = self.registry.acquire(capability)
+		try:
+			future = self.submit(device, capability, document)
+		except BaseException:
+			self.registry.release(device)
+			raise
+		future.add_done_callback(lambda _: self.registry.release(device))
+		return future
+
+	def stats(self):
+		return {
+			'queue_depth': {
+				(device, capability): queue.qsize()
+				for (device, capability), queue in self.queues.items()
+			},
+			'latency': {
+				capability: {'jobs': s.jobs, 'average': s.average, 'max': s.max}
+				for capability, s in self.latency.items()
+			},
+		}
+
+	async def join(self):
+		for queue in self.queues.values():
+			await queue.join()
+
+	async def close(self):
+		"""Stops the workers. Jobs that are still queued or running are cancelled."""
+		self._closed = True
+		for worker in self._workers:
+			worker.cancel()
+		await asyncio.gather(*self._workers, return_exceptions=True)
+		self._workers.clear()
+		for queue in self.queues.values():
+			while not queue.empty():
+				queue.get_nowait().future.cancel()
+				queue.task_done()
+
+	def _is_small(self, document):
+		return isinstance(document, (str, bytes)) and len(document) < self.small_document_size
+
+	async def _work(self, device, capability, queue):
+		method = getattr(device, capability)
+		# A job taken from the queue while batching that did not fit in the batch
+		left_over = None
+		while True:
+			job, left_over = left_over or await queue.get(), None
+			batch = [job]
+			if self._is_small(job.document):
+				while len(batch) < self.max_batch and not queue.empty():
+					candidate = queue.get_nowait()
+					if type(candidate.document) is type(job.document) and self._is_small(candidate.document):
+						batch.append(candidate)
+					else:
+						left_over = candidate
+						break
+			try:
+				await self._run(method, capability, [job for job in batch if not job.future.cancelled()])
+			except asyncio.CancelledError:
+				# The worker is being stopped, the jobs it took will not finish
+				for job in batch:
+					job.future.cancel()
+				if left_over is not None:
+					left_over.future.cancel()
+					queue.task_done()
+				raise
+			finally:
+				for _ in batch:
+					queue.task_done()
+
+	async def _run(self, method, capability, jobs):
+		if not jobs:
+			return
+		if len(jobs) == 1:
+			document = jobs[0].document
+		else:
+			separator = '\n' if isinstance(jobs[0].document, str) else b'\n'
+			document = separator.join(job.document for job in jobs)
+		try:
+			result = await asyncio.to_thread(method, document)
+		except Exception as e:
+			for job in jobs:
+				if not job.future.done():
+					job.future.set_exception(e)
+		else:
+			for job in jobs:
+				if not job.future.done():
+					job.future.set_result(result)
+		now = time.perf_counter()
+		for job in jobs:
+			self.latency[capability].add(now - job.submitted_at)
+
+
+"""
+Fake devices for trying out and testing the dispatcher without hardware. They
+implement the same interfaces, sleep to simulate the device latency, and record
+every call they get.
+"""
+class FakeDevice:
+	def __init__(self, latency=0.01):
+		self.latency = latency
+		self.calls = []
+
+	def _handle(self, capability, document):
+		time.sleep(self.latency)
+		self.calls.append((capability, document))
+		return capability, len(document)
+
+
+class FakePrinter(FakeDevice, PrinterInterface):
+	def print(self, document):
+		return self._handle('print', document)
+
+
+class FakeMultiFunctionDevice(FakeDevice, PrinterInterface, ScannerInterface, FaxInterface):
+	def print(self, document):
+		return self._handle('print', document)
+
+	def scan(self, document):
+		return self._handle('scan', document)
+
+	def fax(self, document):
+		return self._handle('fax', document)
+
+
+"""
+The interfaces above get the whole document as one object, which is a problem
+for scans that are hundreds of MB. Following the same idea, streaming is added
+as separate small interfaces instead of growing the existing ones. Streaming
+methods take and produce an iterable of chunks that support the buffer
+protocol (memoryview, bytes, mmap slices), so a scan can be piped straight into
+a fax without ever holding the whole document:
+
+>>> fax.fax_stream(scanner.scan_stream(document))
+
+A chunk is only valid until the next one is requested, because the producers
+reuse their buffers. Consumers that need to keep data must copy it.
+"""
+import mmap
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StreamingPrinterInterface(ABC):
+	@abstractmethod
+	def print_stream(self, chunks): pass
+
+class StreamingScannerInterface(ABC):
+	@abstractmethod
+	def scan_stream(self, document): pass
+
+class StreamingFaxInterface(ABC):
+	@abstractmethod
+	def fax_stream(self, chunks): pass
+
+
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+	"""Reads a binary file into one reused buffer and yields views of it."""
+	buffer = bytearray(chunk_size)
+	with memoryview(buffer) as view:
+		while n := file.readinto(buffer):
+			with view[:n] as chunk:
+				yield chunk
+
+
+def mmap_chunks(filepath, chunk_size=CHUNK_SIZE):
+	"""Maps a file into memory and yields views of it, nothing is copied."""
+	with open(filepath, 'rb') as f:
+		if not f.seek(0, 2):
+			return  # empty files can not be mapped
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+			for start in range(0, len(view), chunk_size):
+				with view[start:start + chunk_size] as chunk:
+					yield chunk
+
+
+"""
+A fake streaming device. Scanning maps the document file into memory, faxing
+and printing write the chunks to an output file (or just count them).
+"""
+class FakeStreamingDevice(StreamingPrinterInterface, StreamingScannerInterface, StreamingFaxInterface):
+	def __init__(self, output=None):
+		self.output = output
+		self.bytes_sent = 0
+
+	def _send(self, chunks):
+		for chunk in chunks:
+			if self.output is not None:
+				self.output.write(chunk)
+			self.bytes_sent += len(chunk)
+		return self.bytes_sent
+
+	def print_stream(self, chunks):
+		return self._send(chunks)
+
+	def scan_stream(self, document):
+		return mmap_chunks(document)
+
+	def fax_stream(self, chunks):
+		return self._send(chunks)
+
+
+if __name__ == '__main__':
+	async def main():
+		dispatcher = DeviceDispatcher(concurrency={'print': 2}, max_batch=8)
+		printer, mfd = FakePrinter(latency=0.05), FakeMultiFunctionDevice(latency=0.05)
+		dispatcher.add_device(printer)
+		dispatcher.add_device(mfd)
+
+		jobs = [dispatcher.submit(printer, 'print', f'page {i}') for i in range(20)]
+		jobs += [dispatcher.submit(mfd, 'fax', 'x' * 5000) for _ in range(3)]
+		jobs[-1].cancel()
+		depth = dispatcher.stats()['queue_depth']
+		print('Queued print jobs:', depth[printer, 'print'], 'queued fax jobs:', depth[mfd, 'fax'])
+
+		await dispatcher.join()
+		print('Printer calls for 20 pages:', len(printer.calls))
+
+		await asyncio.gather(*(dispatcher.dispatch('print', 'y' * 2000) for _ in range(4)))
+		print('Large pages routed to the printer and the multifunction device:', len(printer.calls) - 3, len(mfd.calls) - 2)
+		print('Faxes sent (one cancelled):', sum(capability == 'fax' for capability, _ in mfd.calls))
+		print('Latency:', dispatcher.stats()['latency'])
+		await dispatcher.close()
+
+	asyncio.run(main())
+
+	# Scan a 64 MB document straight into a fax, the peak memory stays at
+	# the size of a chunk or less, whatever the size of the document
+	import os
+	import tempfile
+	import tracemalloc
+
+	with tempfile.TemporaryDirectory() as directory:
+		scanned, faxed = os.path.join(directory, 'scan.bin'), os.path.join(directory, 'fax.bin')
+		with open(scanned, 'wb') as f:
+			for _ in range(64):
+				f.write(os.urandom(1024 * 1024))
+
+		tracemalloc.start()
+		with open(faxed, 'wb') as output:
+			device = FakeStreamingDevice(output)
+			sent = device.fax_stream(device.scan_stream(scanned))
+		peak = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+		print(f'Faxed {sent // (1024 * 1024)} MB with a peak of {peak / 1024:.0f} KB allocated')
@@ -6,17 +6,79 @@ when we have a base class and a derived class, then the derived class should
 be able to substitute the base class without any unexpected behavior.
 """
 
+from heapq import heappop, heappush
+from math import hypot
+
+# numpy is only needed for RectangleBatch, and importing it takes longer than
+# everything else here, so it is imported when the first batch is created
+np = None
+
+
+def _import_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError('RectangleBatch requires numpy') from None
+        np = numpy
+    return np
+
+
+"""
+Values derived from the width and height are read much more often than the
+width and height change. cached_shape_property works like a property, but keeps
+the value in the _cache slot of the shape until a width or height setter clears
+it. Every setter, including the ones Square overrides, has to call _invalidate().
+"""
+class cached_shape_property:
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, shape, owner=None):
+        if shape is None:
+            return self
+        cache = shape._cache
+        if cache is None:
+            cache = shape._cache = {}
+        try:
+            return cache[self.name]
+        except KeyError:
+            value = cache[self.name] = self.func(shape)
+            return value
 
 
 class Rectangle:
-    def __init__(self, width, height):
+    __slots__ = ('_width', '_height', '_x', '_y', '_cache')
+
+    # x and y place the bottom left corner on a canvas, they are optional
+    def __init__(self, width, height, x=None, y=None):
         self._height = height
         self._width = width
+        self._x = x
+        self._y = y
+        self._cache = None
 
-    @property
+    def _invalidate(self):
+        self._cache = None
+
+    @cached_shape_property
     def area(self):
         return self._width * self._height
 
+    @cached_shape_property
+    def perimeter(self):
+        return 2 * (self._width + self._height)
+
+    @cached_shape_property
+    def diagonal(self):
+        return hypot(self._width, self._height)
+
     def __str__(self):
         return f'Width: {self.width}, height: {self.height}'
 
@@ -27,6 +89,7 @@ class Rectangle:
     @width.setter
     def width(self, value):
         self._width = value
+        self._invalidate()
 
     @property
     def height(self):
@@ -35,6 +98,32 @@ class Rectangle:
     @height.setter
     def height(self, value):
         self._height = value
+        self._invalidate()
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+        self._invalidate()
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+        self._invalidate()
+
+    @cached_shape_property
+    def bounds(self):
+        """(min x, min y, max x, max y), or None if the rectangle has no position."""
+        if self._x is None or self._y is None:
+            return None
+        return (self._x, self._y, self._x + self._width, self._y + self._height)
 
 
 """
@@ -49,16 +138,20 @@ and therefore, the Square class is not a proper substitute for the Rectangle cla
 is a violation of the Liskov's Substitution Principle.
 """
 class Square(Rectangle):
-    def __init__(self, size):
-        Rectangle.__init__(self, size, size)
+    __slots__ = ()
+
+    def __init__(self, size, x=None, y=None):
+        Rectangle.__init__(self, size, size, x, y)
 
     @Rectangle.width.setter
     def width(self, value):
         self._width = self._height = value
+        self._invalidate()
 
     @Rectangle.height.setter
     def height(self, value):
         self._width = self._height = value
+        self._invalidate()
 
 
 """
@@ -74,11 +167,12 @@ def use_it(rc):
     print(f'Expected an area of {expected}, got {rc.area}')
 
 
-rc = Rectangle(2, 3)
-use_it(rc)
+if __name__ == '__main__':
+    rc = Rectangle(2, 3)
+    use_it(rc)
 
-sq = Square(5)
-use_it(sq)
+    sq = Square(5)
+    use_it(sq)
 
 
 """
@@ -94,20 +188,406 @@ objects to the use_it function, and we get the expected result.
 """
 class RectangleFactory:
 	@staticmethod
-	def create_rectangle(width, height):
-		return Rectangle(width, height)
+	def create_rectangle(width, height, x=None, y=None):
+		return Rectangle(width, height, x, y)
+
+	@staticmethod
+	def create_rectangles(widths, heights):
+		return RectangleBatch(widths, heights)
      
 class SquareFactory:
 	@staticmethod
-	def create_square(size):
-		return Rectangle(size, size)
+	def create_square(size, x=None, y=None):
+		return Rectangle(size, size, x, y)
+
+	@staticmethod
+	def create_squares(sizes):
+		sizes = _import_numpy().asarray(sizes)
+		# The batch copies both, so the widths and heights do not share memory
+		return RectangleBatch(sizes, sizes)
      
-rcf = RectangleFactory()
-rc = rcf.create_rectangle(3, 4)
-use_it(rc)
+if __name__ == '__main__':
+    rcf = RectangleFactory()
+    rc = rcf.create_rectangle(3, 4)
+    use_it(rc)
+
+    sqf = SquareFactory()
+    sq = sqf.create_square(5)
+    use_it(sq)
+
+
+"""
+Computing areas through properties one object at a time is slow when there are
+millions of shapes. RectangleBatch keeps the widths and heights of many
+rectangles in two NumPy arrays, and does the same operations on all of them at
+once. The batch copies the sizes it is given, so resize() never changes the
+caller's arrays. Integer sizes stay integers, so the results are exactly the
+ones the Rectangle objects give; when a result could be too large for int64
+it is computed with Python ints (dtype=object) instead of overflowing.
+
+A batch only holds rectangles. Squares are made by SquareFactory.create_squares,
+which just uses the same sizes for widths and heights, like create_square does.
+"""
+class RectangleBatch:
+    def __init__(self, widths, heights):
+        _import_numpy()
+        self.widths = np.array(widths, copy=True)
+        self.heights = np.array(heights, copy=True)
+        if self.widths.shape != self.heights.shape or self.widths.ndim != 1:
+            raise ValueError('widths and heights must be 1-D arrays of the same length')
+
+    @staticmethod
+    def from_rectangles(rectangles):
+        rectangles = list(rectangles)
+        return RectangleBatch(
+            [r.width for r in rectangles], [r.height for r in rectangles]
+        )
+
+    def __len__(self):
+        return len(self.widths)
+
+    def __getitem__(self, i):
+        return Rectangle(self.widths[i].item(), self.heights[i].item())
+
+    def __str__(self):
+        return f'RectangleBatch of {len(self)} rectangles'
+
+    def to_rectangles(self):
+        return [Rectangle(w, h) for w, h in zip(self.widths.tolist(), self.heights.tolist())]
+
+    @property
+    def area(self):
+        return _exact_product(self.widths, self.heights)
+
+    def total_area(self):
+        area = self.area
+        if _may_overflow(area, len(area)):
+            area = area.astype(object)
+        return _python_value(area.sum())
+
+    def mean_area(self):
+        return _python_value(self.area.mean())
+
+    def max_area(self):
+        return _python_value(self.area.max())
+
+    def resize(self, width=None, height=None):
+        """Sets the width and/or height of every rectangle, like the setters do."""
+        if width is not None:
+            self.widths = _assigned(self.widths, width)
+        if height is not None:
+            self.heights = _assigned(self.heights, height)
+        return self
+
+    def scale(self, factor):
+        return RectangleBatch(_exact_product(self.widths, factor), _exact_product(self.heights, factor))
+
+
+def _max_abs(values):
+    values = np.asarray(values)
+    if values.size == 0:
+        return 0
+    return max(abs(int(values.max())), abs(int(values.min())))
+
+
+def _may_overflow(values, factor):
+    """Whether values times something no larger than factor can leave the integer dtype of values."""
+    if values.dtype.kind not in 'iu':
+        return False
+    return _max_abs(values) * factor > np.iinfo(values.dtype).max
+
+
+def _exact_product(a, b):
+    if _may_overflow(a, _max_abs(b)) or _may_overflow(np.asarray(b), _max_abs(a)):
+        return a.astype(object) * b
+    return a * b
+
+
+def _assigned(values, value):
+    """values with every element set to value, in a dtype that can hold both."""
+    value = np.asarray(value)
+    dtype = np.result_type(values, value)
+    if dtype != values.dtype:
+        # Assigning 2.5 into an int array would store 2
+        values = values.astype(dtype)
+    values[...] = value
+    return values
+
+
+def _python_value(value):
+    # NumPy scalars become Python numbers, object arrays already give those
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def use_it_batch(batch):
+    """use_it for a whole batch: returns which rectangles got the expected area."""
+    w = batch.widths.copy()
+    batch.resize(height=10)
+    expected = _exact_product(w, 10)
+    return expected == batch.area
+
+
+"""
+Finding the rectangles at a point or in a window of a canvas by checking every
+rectangle gets slow with millions of them. RectangleIndex is an R-tree: the
+rectangles are grouped into nodes of up to max_entries, every node knows the
+bounding box of everything under it, and a query only walks into the nodes
+whose box it touches.
+
+    1. bulk_load() packs many rectangles at once with Sort-Tile-Recursive (STR)
+       packing, which gives fuller, less overlapping nodes than inserting them
+       one by one.
+    2. insert() and delete() keep the tree up to date afterwards. The index
+       stores the bounds a rectangle had when it was inserted, so after moving
+       or resizing an indexed rectangle call update() on it.
+    3. search() finds the rectangles in a window, at_point() the ones containing
+       a point, overlapping() the ones overlapping another rectangle, and
+       nearest() the k closest ones to a point.
+
+Bounds are closed, so rectangles that only touch count as overlapping.
+"""
+class _RectangleIndexNode:
+    __slots__ = ('leaf', 'entries')
+
+    def __init__(self, leaf, entries):
+        self.leaf = leaf
+        # (min x, min y, max x, max y, rectangle or child node)
+        self.entries = entries
+
+    def bounds(self):
+        entries = self.entries
+        return (
+            min(e[0] for e in entries), min(e[1] for e in entries),
+            max(e[2] for e in entries), max(e[3] for e in entries),
+        )
+
+
+def _intersects(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def _enlargement(entry, bounds):
+    area = (entry[2] - entry[0]) * (entry[3] - entry[1])
+    enlarged = (
+        (max(entry[2], bounds[2]) - min(entry[0], bounds[0]))
+        * (max(entry[3], bounds[3]) - min(entry[1], bounds[1]))
+    )
+    return enlarged - area, area
+
+
+def _distance(entry, x, y):
+    dx = max(entry[0] - x, 0, x - entry[2])
+    dy = max(entry[1] - y, 0, y - entry[3])
+    return hypot(dx, dy)
+
+
+class RectangleIndex:
+    def __init__(self, max_entries=16):
+        self.max_entries = max_entries
+        self._root = _RectangleIndexNode(True, [])
+        self._bounds = {}  # rectangle -> bounds it was indexed with
+
+    def __len__(self):
+        return len(self._bounds)
+
+    def __contains__(self, rectangle):
+        return rectangle in self._bounds
+
+    @staticmethod
+    def _bounds_of(rectangle):
+        bounds = rectangle.bounds
+        if bounds is None:
+            raise ValueError('Only rectangles with a position can be indexed')
+        return bounds
+
+    @staticmethod
+    def bulk_load(rectangles, max_entries=16):
+        index = RectangleIndex(max_entries)
+        entries = []
+        for rectangle in rectangles:
+            bounds = index._bounds_of(rectangle)
+            index._bounds[rectangle] = bounds
+            entries.append((*bounds, rectangle))
+        if not entries:
+            return index
+        leaf = True
+        while True:
+            nodes = index._pack(entries, leaf)
+            if len(nodes) == 1:
+                index._root = nodes[0]
+                return index
+            entries = [(*node.bounds(), node) for node in nodes]
+            leaf = False
+
+    def _pack(self, entries, leaf):
+        # Sort-Tile-Recursive: cut the entries into vertical slices by x, then
+        # cut every slice into nodes by y
+        m = self.max_entries
+        node_count = -(-len(entries) // m)
+        slice_count = max(1, round(node_count ** 0.5))
+        slice_size = -(-len(entries) // slice_count)
+        slice_size = -(-slice_size // m) * m
+        entries.sort(key=lambda e: e[0] + e[2])
+        nodes = []
+        for i in range(0, len(entries), slice_size):
+            column = sorted(entries[i:i + slice_size], key=lambda e: e[1] + e[3])
+            for j in range(0, len(column), m):
+                nodes.append(_RectangleIndexNode(leaf, column[j:j + m]))
+        return nodes
+
+    def insert(self, rectangle):
+        if rectangle in self._bounds:
+            raise ValueError('Rectangle is already indexed')
+        bounds = self._bounds_of(rectangle)
+        self._bounds[rectangle] = bounds
+        split = self._insert(self._root, (*bounds, rectangle))
+        if split is not None:
+            old_root = self._root
+            self._root = _RectangleIndexNode(False, [
+                (*old_root.bounds(), old_root), (*split.bounds(), split)
+            ])
+
+    def _insert(self, node, entry):
+        """Adds entry under node. Returns the new sibling if node had to be split."""
+        if node.leaf:
+            node.entries.append(entry)
+        else:
+            i = min(range(len(node.entries)), key=lambda i: _enlargement(node.entries[i], entry))
+            child = node.entries[i][4]
+            split = self._insert(child, entry)
+            node.entries[i] = (*child.bounds(), child)
+            if split is not None:
+                node.entries.append((*split.bounds(), split))
+        if len(node.entries) <= self.max_entries:
+            return None
+        return self._split(node)
+
+    def _split(self, node):
+        # Split along the axis where the entries are spread out the most
+        entries = node.entries
+        spread_x = max(e[2] for e in entries) - min(e[0] for e in entries)
+        spread_y = max(e[3] for e in entries) - min(e[1] for e in entries)
+        if spread_x >= spread_y:
+            entries.sort(key=lambda e: e[0] + e[2])
+        else:
+            entries.sort(key=lambda e: e[1] + e[3])
+        half = len(entries) // 2
+        node.entries = entries[:half]
+        return _RectangleIndexNode(node.leaf, entries[half:])
+
+    def delete(self, rectangle):
+        bounds = self._bounds.pop(rectangle)
+        if not self._delete(self._root, rectangle, bounds):
+            raise LookupError('Rectangle not found in the index')
+        # Drop levels that only have one child left
+        while not self._root.leaf and len(self._root.entries) == 1:
+            self._root = self._root.entries[0][4]
+        if not self._root.entries:
+            self._root = _RectangleIndexNode(True, [])
+
+    def _delete(self, node, rectangle, bounds):
+        for i, entry in enumerate(node.entries):
+            if not _intersects(entry, bounds):
+                continue
+            if node.leaf:
+                if entry[4] is rectangle:
+                    del node.entries[i]
+                    return True
+            elif self._delete(entry[4], rectangle, bounds):
+                child = entry[4]
+                if child.entries:
+                    node.entries[i] = (*child.bounds(), child)
+                else:
+                    del node.entries[i]
+                return True
+        return False
+
+    def update(self, rectangle):
+        """Re-indexes a rectangle after it was moved or resized."""
+        self.delete(rectangle)
+        self.insert(rectangle)
+
+    def search(self, min_x, min_y, max_x, max_y):
+        window = (min_x, min_y, max_x, max_y)
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for entry in node.entries:
+                if entry[0] <= max_x and min_x <= entry[2] and entry[1] <= max_y and min_y <= entry[3]:
+                    if node.leaf:
+                        found.append(entry[4])
+                    else:
+                        stack.append(entry[4])
+        return found
+
+    def at_point(self, x, y):
+        return self.search(x, y, x, y)
+
+    def overlapping(self, rectangle):
+        return [r for r in self.search(*self._bounds_of(rectangle)) if r is not rectangle]
+
+    def nearest(self, x, y, k=1):
+        """The k rectangles closest to the point, closest first. Distance is 0 inside a rectangle."""
+        # Best first search: always expand whatever is closest, a node can not
+        # contain anything closer than its own bounding box
+        heap = [(0.0, 0, self._root)]
+        found = []
+        counter = 1
+        while heap and len(found) < k:
+            distance, _, item = heappop(heap)
+            if isinstance(item, _RectangleIndexNode):
+                for entry in item.entries:
+                    heappush(heap, (_distance(entry, x, y), counter, entry[4]))
+                    counter += 1
+            else:
+                found.append(item)
+        return found
+
+
+if __name__ == '__main__':
+    import sys
+    from timeit import timeit
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    rng = _import_numpy().random.default_rng(0)
+    widths, heights = rng.integers(1, 1000, n), rng.integers(1, 1000, n)
+
+    rectangles = [RectangleFactory.create_rectangle(w, h) for w, h in zip(widths.tolist(), heights.tolist())]
+    batch = RectangleFactory.create_rectangles(widths, heights)
+    assert batch.area.tolist() == [r.area for r in rectangles]
+
+    print(f'Total area of {n} rectangles:')
+    print(' - objects: %.3fs' % timeit(lambda: sum(r.area for r in rectangles), number=1))
+    print(' - batch:   %.3fs' % timeit(batch.total_area, number=1))
+    print(f'use_it on {n} rectangles:')
+    print(' - objects: %.3fs' % timeit(lambda: [setattr(r, 'height', 10) or r.area for r in rectangles], number=1))
+    print(' - batch:   %.3fs' % timeit(lambda: use_it_batch(batch), number=1))
+    assert batch.area.tolist() == [r.area for r in rectangles]
 
-sqf = SquareFactory()
-sq = sqf.create_square(5)
-use_it(sq)
+    # Window queries on positioned rectangles: R-tree against a linear scan
+    m = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    xs, ys = rng.uniform(0, 100_000, m).tolist(), rng.uniform(0, 100_000, m).tolist()
+    placed = [
+        RectangleFactory.create_rectangle(w, h, x, y)
+        for w, h, x, y in zip(widths[:m].tolist(), rng.integers(1, 1000, m).tolist(), xs, ys)
+    ]
+    windows = [(x, y, x + 2000, y + 2000) for x, y in zip(xs[:100], ys[:100])]
 
+    def linear_scan(min_x, min_y, max_x, max_y):
+        return [
+            r for r in placed
+            if r.x <= max_x and min_x <= r.x + r.width and r.y <= max_y and min_y <= r.y + r.height
+        ]
 
+    print(f'Indexing {m} positioned rectangles:')
+    index = None
+    def load():
+        global index
+        index = RectangleIndex.bulk_load(placed)
+    print(' - bulk load:   %.3fs' % timeit(load, number=1))
+    print(f'Time per query on {m} rectangles:')
+    print(' - window, linear scan: %.3fms' % (timeit(lambda: [linear_scan(*w) for w in windows[:10]], number=1) * 100))
+    print(' - window, index:       %.3fms' % (timeit(lambda: [index.search(*w) for w in windows], number=1) * 10))
+    print(' - 10 nearest, index:   %.3fms' % (timeit(lambda: [index.nearest(x, y, 10) for x, y in zip(xs[:100], ys[:100])], number=1) * 10))
+    assert all(set(map(id, index.search(*w))) == set(map(id, linear_scan(*w))) for w in windows[:3])
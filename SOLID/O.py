@@ -135,59 +135,471 @@ class ColorSpecification(Specification, MakePrintable):
 		return item.color == self.color
 
 
+"""
+When a combined specification is slow or filters badly, it is hard to tell which
+part of it is responsible. Instrumentation is opt-in: metrics.instrument(spec)
+returns a copy of the specification tree where every node counts how often it
+was evaluated, how often it was satisfied, how often an AND/OR stopped early
+(short circuit) and how much time it took. Nothing changes for the original
+specifications and BetterFilter, so there is no cost unless it is used.
+
+>>> metrics = SpecificationMetrics()
+>>> for p in InstrumentedFilter(metrics).filter(products, large & green): ...
+>>> metrics.export(LoggingSink())
+
+Sinks decide where the numbers go: InMemorySink keeps them, LoggingSink logs
+them, and PrometheusTextSink renders the Prometheus text format and can serve
+it on a local port.
+
+The selectivity (fraction of items that satisfy a node) is also what is needed
+to order predicates well. An AND should first check the child that is cheap and
+most likely to fail, an OR the child that is cheap and most likely to succeed.
+InstrumentedSpecification.optimized() returns the specification with the
+children reordered that way. Keep in mind that a child is only evaluated when
+the ones before it did not decide the result, so what is known about a later
+child only holds for the items that got that far.
+"""
+import time
+
+
+class NodeStats:
+	__slots__ = ('evaluations', 'satisfied', 'short_circuits', 'seconds')
+
+	def __init__(self):
+		self.clear()
+
+	def clear(self):
+		self.evaluations = 0
+		self.satisfied = 0
+		self.short_circuits = 0
+		self.seconds = 0.0
+
+	@property
+	def selectivity(self) -> float:
+		return self.satisfied / self.evaluations if self.evaluations else 0.0
+
+	@property
+	def cost(self) -> float:
+		return self.seconds / self.evaluations if self.evaluations else 0.0
+
+	def as_dict(self) -> dict:
+		return {
+			'evaluations': self.evaluations,
+			'satisfied': self.satisfied,
+			'short_circuits': self.short_circuits,
+			'seconds': self.seconds,
+			'selectivity': self.selectivity,
+		}
+
+
+class InstrumentedSpecification(Specification):
+	def __init__(self, spec: Specification, name: str, stats: NodeStats, children: list['InstrumentedSpecification']):
+		self.spec = spec
+		self.name = name
+		self.stats = stats
+		self.children = children
+
+	def is_satisfied(self, item: Product) -> bool:
+		stats = self.stats
+		start = time.perf_counter()
+		if isinstance(self.spec, AndSpecification):
+			result = self._combine(item, stop_on=False)
+		elif isinstance(self.spec, OrSpecification):
+			result = self._combine(item, stop_on=True)
+		else:
+			result = self.spec.is_satisfied(item)
+		stats.seconds += time.perf_counter() - start
+		stats.evaluations += 1
+		if result:
+			stats.satisfied += 1
+		return result
+
+	def _combine(self, item: Product, stop_on: bool) -> bool:
+		last = len(self.children) - 1
+		for i, child in enumerate(self.children):
+			if child.is_satisfied(item) == stop_on:
+				if i < last:
+					self.stats.short_circuits += 1
+				return stop_on
+		return not stop_on
+
+	def optimized(self, min_evaluations: int = 20) -> Specification:
+		"""
+		The original specification with AND/OR children in the best order seen so far.
+
+		A child is only evaluated when the children before it did not decide the
+		result, so the stats of later children are conditional on the earlier
+		ones. Children evaluated fewer than min_evaluations times keep their
+		position, too little is known about them to move them.
+		"""
+		if not self.children:
+			return self.spec
+		if isinstance(self.spec, AndSpecification):
+			# cheap and likely to fail first
+			key = lambda child: child.stats.cost / max(1 - child.stats.selectivity, 1e-9)
+		else:
+			# cheap and likely to succeed first
+			key = lambda child: child.stats.cost / max(child.stats.selectivity, 1e-9)
+		measured = [i for i, child in enumerate(self.children) if child.stats.evaluations >= min_evaluations]
+		ordered = list(self.children)
+		for i, child in zip(measured, sorted((self.children[i] for i in measured), key=key)):
+			ordered[i] = child
+		return type(self.spec)(*(child.optimized(min_evaluations) for child in ordered))
+
+
+class SpecificationMetrics:
+	def __init__(self):
+		self.nodes = {}  # name -> NodeStats
+
+	def instrument(self, spec: Specification, name: str = 'spec') -> InstrumentedSpecification:
+		if isinstance(spec, InstrumentedSpecification):
+			return spec
+		# The structure is part of the name, so different specifications that go
+		# through the same filter are counted separately
+		name = f'{name}:{_describe(spec)}'
+		children = []
+		if isinstance(spec, (AndSpecification, OrSpecification)):
+			kind = 'and' if isinstance(spec, AndSpecification) else 'or'
+			children = [
+				self.instrument(child, f'{name}.{kind}[{i}]')
+				for i, child in enumerate(spec.args)
+			]
+		stats = self.nodes.setdefault(name, NodeStats())
+		return InstrumentedSpecification(spec, name, stats, children)
+
+	def export(self, sink: 'MetricsSink'):
+		sink.export(self.nodes)
+
+	def reset(self):
+		# Cleared in place, the instrumented specifications keep counting on these objects
+		for stats in self.nodes.values():
+			stats.clear()
+
+
+def _describe(spec: Specification) -> str:
+	if isinstance(spec, AndSpecification):
+		return '(' + ' & '.join(map(_describe, spec.args)) + ')'
+	if isinstance(spec, OrSpecification):
+		return '(' + ' | '.join(map(_describe, spec.args)) + ')'
+	# Without a __str__ of its own (e.g. from MakePrintable) the name would be
+	# the object's address, a new one for every instance
+	if type(spec).__str__ is object.__str__ and type(spec).__repr__ is object.__repr__:
+		return type(spec).__name__
+	return str(spec)
+
+
+class InstrumentedFilter(Filter):
+	def __init__(self, metrics: SpecificationMetrics, name: str = 'filter'):
+		self.metrics = metrics
+		self.name = name
+
+	def filter(self, items: Iterable[Product], spec: Specification) -> Iterator[Product]:
+		spec = self.metrics.instrument(spec, self.name)
+		for item in items:
+			if spec.is_satisfied(item):
+				yield item
 
 
-# products
-apple = Product("Apple", Color.GREEN, Size.SMALL)
-tree = Product("Tree", Color.GREEN, Size.LARGE)
-house = Product("House", Color.BLUE, Size.LARGE)
-banana = Product("Banana", Color.YELLOW, Size.SMALL)
-grape = Product("Grape", Color.YELLOW, Size.SMALL)
-pineapple = Product("Pineapple", Color.YELLOW, Size.LARGE)
-mango = Product("Mango", Color.YELLOW, Size.MEDIUM)
-orange = Product("Orange", Color.YELLOW, Size.MEDIUM)
-
-products = [apple, tree, house, banana, grape, pineapple, mango, orange]
-
-# old filter
-pf = ProductFilter()
-print("Green products (old):")
-for p in pf.filter_by_color(products, Color.GREEN):
-	print(f" - {p}")
-print()
-
-# new filter
-bf = BetterFilter()
-print("Green products (new):")
-green = ColorSpecification(Color.GREEN)
-for p in bf.filter(products, green):
-	print(f" - {p}")
-
-print("Large products:")
-large = SizeSpecification(Size.LARGE)
-for p in bf.filter(products, large):
-	print(f" - {p}")
-
-print()
-print("Large and green items:")
-# This is possible because of the __and__ method in the Specification class.
-# Otherwise we would have written AndSpecification(large, green)
-large_and_green = large & green
-for p in bf.filter(products, large_and_green):
-	print(f" - {p}")
-
-print()
-print("Large or green items:")
-# This is possible because of the __or__ method in the Specification class.
-# Otherwise we would have written OrSpecification(large, green)
-large_or_green = large | green
-for p in bf.filter(products, large_or_green):
-	print(f" - {p}")
-
-# Because of this excellent design pattern we can combine the specifications in any way we want.
-# Examples:
-# 1. large_and_green = large & green
-# 2. large_or_green = large | green
-# 3. large_and_green_or_yellow = (large & green) | yellow
-# 4. large_and_green_or_yellow = large & (green | yellow)
-# and so on...
+class MetricsSink(ABC):
+	@abstractmethod
+	def export(self, nodes: dict[str, NodeStats]):
+		pass
+
+class InMemorySink(MetricsSink):
+	def __init__(self):
+		self.exports = []
+
+	def export(self, nodes: dict[str, NodeStats]):
+		self.exports.append({name: stats.as_dict() for name, stats in nodes.items()})
+
+class LoggingSink(MetricsSink):
+	# logging is only imported when a LoggingSink is made, it is not cheap to import
+	def __init__(self, logger: 'logging.Logger | None' = None, level: int | None = None):
+		import logging
+		self.logger = logger or logging.getLogger(__name__)
+		self.level = logging.INFO if level is None else level
+
+	def export(self, nodes: dict[str, NodeStats]):
+		for name, stats in nodes.items():
+			self.logger.log(
+				self.level,
+				'%s: %d evaluations, %.1f%% satisfied, %d short circuits, %.6fs',
+				name, stats.evaluations, stats.selectivity * 100, stats.short_circuits, stats.seconds,
+			)
+
+class PrometheusTextSink(MetricsSink):
+	METRICS = (
+		('specification_evaluations_total', 'counter', 'evaluations'),
+		('specification_satisfied_total', 'counter', 'satisfied'),
+		('specification_short_circuits_total', 'counter', 'short_circuits'),
+		('specification_seconds_total', 'counter', 'seconds'),
+	)
+
+	def __init__(self):
+		self.text = ''
+		self._server = None
+
+	def export(self, nodes: dict[str, NodeStats]):
+		lines = []
+		for metric, kind, field in self.METRICS:
+			lines.append(f'# TYPE {metric} {kind}')
+			for name, stats in nodes.items():
+				label = name.replace('\\', '\\\\').replace('"', '\\"')
+				lines.append(f'{metric}{{node="{label}"}} {getattr(stats, field)}')
+		self.text = '\n'.join(lines) + '\n'
+
+	def serve(self, port: int = 9464, host: str = '127.0.0.1') -> 'ThreadingHTTPServer':
+		"""Serves the last export on http://host:port/metrics from a background thread."""
+		# Only needed when serving, so importing O.py does not pay for them
+		import threading
+		from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+		sink = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def do_GET(self):
+				body = sink.text.encode()
+				self.send_response(200)
+				self.send_header('Content-Type', 'text/plain; version=0.0.4')
+				self.send_header('Content-Length', str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				pass
+
+		self._server = ThreadingHTTPServer((host, port), Handler)
+		threading.Thread(target=self._server.serve_forever, daemon=True).start()
+		return self._server
+
+	def close(self):
+		if self._server is not None:
+			self._server.shutdown()
+			self._server.server_close()
+			self._server = None
+
+"""
+MakePrintable is fine for looking at a catalog, but its output can not be read
+back. ProductCatalogSnapshot stores a catalog in a compact binary file instead,
+in the layout of snapshot_file.py: a versioned header, one fixed width record
+per product with its name (uint32 index into the string table), color and
+size (the enum values as uint8), and a string table with every distinct name
+once.
+
+Opening a snapshot maps the file with mmap and only reads the header, so it is
+instant however large the catalog is. Products are decoded one at a time when
+they are used, and filter() checks Color and Size specifications against the
+raw record bytes, so only the products that match are ever built. Any other
+specification still works, it just has to look at every product.
+
+>>> ProductCatalogSnapshot.save(products, "catalog.bin")
+>>> with ProductCatalogSnapshot("catalog.bin") as catalog:
+...     large_and_green = list(catalog.filter(large & green))
+"""
+import struct
+from itertools import compress
+
+
+def _snapshot_file():
+	# Imported when a snapshot is used: relatively as part of the package, from
+	# this directory when O.py is run as a script
+	if __package__:
+		from . import snapshot_file
+	else:
+		import snapshot_file
+	return snapshot_file
+
+
+class ProductCatalogSnapshot:
+	MAGIC = b'PCAT'
+	VERSION = 1
+	RECORD = struct.Struct('<IBB')
+
+	_colors = {color.value: color for color in Color}
+	_sizes = {size.value: size for size in Size}
+
+	def __init__(self, filepath):
+		self._file = _snapshot_file().SnapshotFile(filepath, self.MAGIC, self.VERSION, self.RECORD, 'product catalog snapshot')
+		self._records = self._file.records
+		self._count = self._file.count
+
+	def __enter__(self) -> 'ProductCatalogSnapshot':
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._file.close()
+
+	def __len__(self) -> int:
+		return self._count
+
+	def __getitem__(self, index: int) -> Product:
+		if not -self._count <= index < self._count:
+			raise IndexError('product index out of range')
+		return self._product(*self.RECORD.unpack_from(self._records, index % self._count * self.RECORD.size))
+
+	def __iter__(self) -> Iterator[Product]:
+		for record in self.RECORD.iter_unpack(self._records):
+			yield self._product(*record)
+
+	def _product(self, name: int, color: int, size: int) -> Product:
+		return Product(self._file.text(name), self._colors[color], self._sizes[size])
+
+	def filter(self, spec: Specification) -> Iterator[Product]:
+		for index in self.matching(spec):
+			yield self[index]
+
+	def matching(self, spec: Specification) -> Iterator[int]:
+		"""Indexes of the products that satisfy spec."""
+		accepted = _accepted_keys(spec)
+		if accepted is None:
+			for index, product in enumerate(self):
+				if spec.is_satisfied(product):
+					yield index
+			return
+		# Work on whole columns of the raw records: a 0/1 byte per product for the
+		# accepted colors, AND-ed with the sizes accepted for that color. The
+		# masks are big ints, so all of it runs in C.
+		colors = self._records[4::self.RECORD.size].tobytes()
+		sizes = self._records[5::self.RECORD.size].tobytes()
+		mask = 0
+		for color in {color for color, _ in accepted}:
+			mask |= _flags(colors, {color}) & _flags(sizes, {size for c, size in accepted if c == color})
+		yield from compress(range(self._count), mask.to_bytes(self._count, 'little'))
+
+	@staticmethod
+	def save(products: Iterable[Product], filepath) -> int:
+		"""Writes the products to filepath and returns how many there were."""
+		cls = ProductCatalogSnapshot
+		with _snapshot_file().SnapshotWriter(filepath, cls.MAGIC, cls.VERSION, cls.RECORD) as writer:
+			for product in products:
+				writer.add(writer.text(product.name), product.color.value, product.size.value)
+		return writer.count
+
+
+def _accepted_keys(spec: Specification) -> set[tuple[int, int]] | None:
+	"""
+	The (color, size) values that satisfy spec, or None when spec looks at more
+	than the color and size. There are only a few combinations, so it is cheaper
+	to try them all once than to build every product.
+	"""
+	if not _uses_only_color_and_size(spec):
+		return None
+	return {
+		(color.value, size.value)
+		for color in Color
+		for size in Size
+		if spec.is_satisfied(Product('', color, size))
+	}
+
+def _flags(column: bytes, values: set[int]) -> int:
+	"""An int with a 1 byte for every byte of column that is in values, and 0 for the rest."""
+	table = bytes(1 if value in values else 0 for value in range(256))
+	return int.from_bytes(column.translate(table), 'little')
+
+def _uses_only_color_and_size(spec: Specification) -> bool:
+	if type(spec) in (AndSpecification, OrSpecification):
+		return all(map(_uses_only_color_and_size, spec.args))
+	return type(spec) in (ColorSpecification, SizeSpecification)
+
+
+
+
+
+if __name__ == "__main__":
+	# products
+	apple = Product("Apple", Color.GREEN, Size.SMALL)
+	tree = Product("Tree", Color.GREEN, Size.LARGE)
+	house = Product("House", Color.BLUE, Size.LARGE)
+	banana = Product("Banana", Color.YELLOW, Size.SMALL)
+	grape = Product("Grape", Color.YELLOW, Size.SMALL)
+	pineapple = Product("Pineapple", Color.YELLOW, Size.LARGE)
+	mango = Product("Mango", Color.YELLOW, Size.MEDIUM)
+	orange = Product("Orange", Color.YELLOW, Size.MEDIUM)
+
+	products = [apple, tree, house, banana, grape, pineapple, mango, orange]
+
+	# old filter
+	pf = ProductFilter()
+	print("Green products (old):")
+	for p in pf.filter_by_color(products, Color.GREEN):
+		print(f" - {p}")
+	print()
+
+	# new filter
+	bf = BetterFilter()
+	print("Green products (new):")
+	green = ColorSpecification(Color.GREEN)
+	for p in bf.filter(products, green):
+		print(f" - {p}")
+
+	print("Large products:")
+	large = SizeSpecification(Size.LARGE)
+	for p in bf.filter(products, large):
+		print(f" - {p}")
+
+	print()
+	print("Large and green items:")
+	# This is possible because of the __and__ method in the Specification class.
+	# Otherwise we would have written AndSpecification(large, green)
+	large_and_green = large & green
+	for p in bf.filter(products, large_and_green):
+		print(f" - {p}")
+
+	print()
+	print("Large or green items:")
+	# This is possible because of the __or__ method in the Specification class.
+	# Otherwise we would have written OrSpecification(large, green)
+	large_or_green = large | green
+	for p in bf.filter(products, large_or_green):
+		print(f" - {p}")
+
+	# Because of this excellent design pattern we can combine the specifications in any way we want.
+	# Examples:
+	# 1. large_and_green = large & green
+	# 2. large_or_green = large | green
+	# 3. large_and_green_or_yellow = (large & green) | yellow
+	# 4. large_and_green_or_yellow = large & (green | yellow)
+	# and so on...
+
+	# Instrumentation shows which part of a specification does the work, and
+	# can reorder the parts based on what it saw
+	metrics = SpecificationMetrics()
+	spec = ColorSpecification(Color.YELLOW) & large
+	print()
+	print("Large and yellow items (instrumented):")
+	for p in InstrumentedFilter(metrics).filter(products, spec):
+		print(f" - {p}")
+	for name, stats in metrics.nodes.items():
+		print(f"   {name}: {stats.evaluations} evaluated, {stats.selectivity:.0%} satisfied, {stats.short_circuits} short circuits")
+	print("Optimized order (too few products to move anything):", [str(s) for s in metrics.instrument(spec, "filter").optimized().args])
+
+	# A binary snapshot of a large catalog opens instantly and can be filtered
+	# without building every product
+	import os
+	import sys
+	import tempfile
+	from timeit import default_timer as timer
+
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+	colors, sizes = list(Color), list(Size)
+	catalog = (
+		Product(f"Product {i % 1000}", colors[i % len(colors)], sizes[i // 7 % len(sizes)])
+		for i in range(n)
+	)
+	filepath = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+	print()
+	print(f"Catalog snapshot with {n} products:")
+	start = timer()
+	ProductCatalogSnapshot.save(catalog, filepath)
+	print(f" - save:   {timer() - start:.3f}s, {os.path.getsize(filepath) / n:.1f} bytes per product")
+	start = timer()
+	snapshot = ProductCatalogSnapshot(filepath)
+	print(f" - open:   {timer() - start:.6f}s")
+	start = timer()
+	matches = sum(1 for _ in snapshot.matching(large & green))
+	print(f" - filter: {timer() - start:.3f}s, {matches} large and green, first is {snapshot[next(snapshot.matching(large & green))]}")
+	snapshot.close()
+	os.remove(filepath)
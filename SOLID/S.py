@@ -7,6 +7,10 @@ This principle states that a class should have only one responsibility,
 only one reason to change. This means that a class should have only one job.
 """
 
+import os
+import struct
+import threading
+import zlib
 from pathlib import Path
 
 
@@ -109,4 +113,269 @@ class FilePersistenceManager:
 			for line in f.readlines():
 				journal.add_entry(line.strip())
 		return journal
-		
\ No newline at end of file
+		
+
+
+class JournalStore:
+	"""
+	FilePersistenceManager writes one file per journal, which is fine for one
+	journal but slow for thousands of them: every save opens, writes and closes
+	its own file, one after the other. The JournalStore keeps many journals in a
+	few segment files instead, and is still only about persistence, the journals
+	themselves stay plain JournalA objects.
+
+		1. Every journal lives in one segment, picked by a hash of its name.
+		2. put() only marks a journal as dirty. flush() writes all dirty journals
+		   of a segment with a single write, and flushes the segments in parallel
+		   on a thread pool.
+		3. Segments are append only, a saved journal is written as a new record
+		   and the index points at the latest one. compact() drops the old records.
+		4. Opening a store only checks the records and builds the index, no
+		   journal is decoded. A journal is read from disk the first time get()
+		   asks for it.
+
+	A record is a header (crc32, name size, payload size, journal count, entry
+	count), the UTF-8 name, the entry sizes and the UTF-8 entries. The crc32
+	covers everything after it, so a record that a crash in the middle of a flush
+	left incomplete is found when the store is opened again, and the segment is
+	cut off before it.
+	"""
+	RECORD = struct.Struct("<IIIQI")
+	SEGMENT_NAME = "segment-{:04d}.log"
+
+	def __init__(self, directory: Path, segments: int = 16, max_workers: int | None = None):
+		self.directory = Path(directory)
+		self.directory.mkdir(parents=True, exist_ok=True)
+		# A store that already has more segments keeps using all of them
+		while (self.directory / self.SEGMENT_NAME.format(segments)).exists():
+			segments += 1
+		self._lock = threading.Lock()
+		# Only one flush or compaction at a time, so a segment has one writer
+		self._flush_lock = threading.Lock()
+		# Importing this takes longer than the rest of the module, so only pay
+		# for it when a store is used
+		from concurrent.futures import ThreadPoolExecutor
+		self._executor = ThreadPoolExecutor(max_workers=max_workers)
+		self._journals = {}  # name -> JournalA, for the journals in memory
+		self._dirty = set()
+		self._index = {}  # name -> (segment, offset, size) of its latest record
+		self._fds = []
+		self._sizes = []
+		for segment in range(segments):
+			path = self.directory / self.SEGMENT_NAME.format(segment)
+			self._fds.append(os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644))
+			self._sizes.append(self._scan(segment, path))
+
+	def __enter__(self) -> "JournalStore":
+		return self
+
+	def __exit__(self, *args):
+		self.flush()
+		self.close()
+
+	def close(self):
+		self._executor.shutdown()
+		for fd in self._fds:
+			os.close(fd)
+		self._fds = []
+
+	def __len__(self) -> int:
+		with self._lock:
+			return len(self._index.keys() | self._journals.keys())
+
+	def __contains__(self, name: str) -> bool:
+		with self._lock:
+			return name in self._journals or name in self._index
+
+	def _scan(self, segment: int, path: Path) -> int:
+		"""Indexes the records of a segment and returns where the next one goes."""
+		offset = 0
+		with open(path, "rb") as f:
+			size = os.fstat(f.fileno()).st_size
+			while offset + self.RECORD.size <= size:
+				header = f.read(self.RECORD.size)
+				crc, name_size, payload_size, _, _ = self.RECORD.unpack(header)
+				record_size = self.RECORD.size + name_size + payload_size
+				if offset + record_size > size:
+					break
+				data = f.read(name_size + payload_size)
+				if zlib.crc32(data, zlib.crc32(header[4:])) != crc:
+					break
+				name = data[:name_size].decode("utf-8")
+				self._index[name] = (segment, offset, record_size)
+				offset += record_size
+		if offset < size:
+			# Cut off the broken record and everything after it, or the next
+			# append would follow it
+			os.truncate(path, offset)
+		return offset
+
+	def _segment_of(self, name: str) -> int:
+		if name in self._index:
+			return self._index[name][0]
+		return zlib.crc32(name.encode("utf-8")) % len(self._fds)
+
+	def get(self, name: str) -> JournalA:
+		with self._lock:
+			journal = self._journals.get(name)
+			if journal is None:
+				segment, offset, size = self._index[name]
+				_, journal = self._decode(os.pread(self._fds[segment], size, offset))
+				self._journals[name] = journal
+			return journal
+
+	def put(self, name: str, journal: JournalA):
+		"""Adds or replaces a journal. It is written by the next flush()."""
+		with self._lock:
+			self._journals[name] = journal
+			self._dirty.add(name)
+
+	def flush(self, sync: bool = False) -> int:
+		"""Writes all dirty journals and returns how many. sync waits until they are on disk."""
+		with self._flush_lock:
+			with self._lock:
+				dirty, self._dirty = self._dirty, set()
+				batches = {}
+				for name in dirty:
+					batches.setdefault(self._segment_of(name), []).append((name, self._journals[name]))
+			futures = [
+				(self._executor.submit(self._write_segment, segment, journals, sync), journals)
+				for segment, journals in batches.items()
+			]
+			errors = []
+			for future, journals in futures:
+				if future.exception() is not None:
+					errors.append(future.exception())
+					with self._lock:
+						self._dirty.update(name for name, _ in journals)
+			if errors:
+				raise errors[0]
+			return len(dirty)
+
+	def _write_segment(self, segment: int, journals: list, sync: bool):
+		records = [self._encode(name, journal) for name, journal in journals]
+		fd = self._fds[segment]
+		offset = self._sizes[segment]
+		view = memoryview(b"".join(records))
+		try:
+			while view:
+				view = view[os.write(fd, view):]
+			if sync:
+				os.fsync(fd)
+		except BaseException:
+			# Drop whatever part of the batch got written, or the next records
+			# would follow it and be indexed at the wrong offsets
+			os.ftruncate(fd, offset)
+			raise
+		with self._lock:
+			for (name, _), record in zip(journals, records):
+				self._index[name] = (segment, offset, len(record))
+				offset += len(record)
+		self._sizes[segment] = offset
+
+	def compact(self) -> int:
+		"""Rewrites the segments with only the latest record of every journal. Returns the bytes freed."""
+		with self._flush_lock, self._lock:
+			live = [[] for _ in self._fds]
+			for name, (segment, offset, size) in self._index.items():
+				live[segment].append((name, offset, size))
+			before = sum(self._sizes)
+			for segment, fd, index in self._executor.map(self._compact_segment, range(len(self._fds)), live):
+				os.close(self._fds[segment])
+				self._fds[segment] = fd
+				self._index.update(index)
+				self._sizes[segment] = sum(size for _, _, size in index.values())
+			return before - sum(self._sizes)
+
+	def _compact_segment(self, segment: int, records: list):
+		path = self.directory / self.SEGMENT_NAME.format(segment)
+		fd = self._fds[segment]
+		records.sort(key=lambda record: record[1])
+		index = {}
+		offset = 0
+		with open(path.with_suffix(".tmp"), "wb") as f:
+			for name, old_offset, size in records:
+				f.write(os.pread(fd, size, old_offset))
+				index[name] = (segment, offset, size)
+				offset += size
+			# The new segment has to be on disk before it replaces the old one,
+			# or a crash could leave an empty segment behind
+			f.flush()
+			os.fsync(f.fileno())
+		os.replace(path.with_suffix(".tmp"), path)
+		directory = os.open(self.directory, os.O_RDONLY)
+		try:
+			os.fsync(directory)
+		finally:
+			os.close(directory)
+		return segment, os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644), index
+
+	def _encode(self, name: str, journal: JournalA) -> bytearray:
+		entries = [entry.encode("utf-8") for entry in journal.entries]
+		sizes = struct.pack(f"<{len(entries)}I", *map(len, entries))
+		name = name.encode("utf-8")
+		payload_size = len(sizes) + sum(map(len, entries))
+		record = bytearray(self.RECORD.pack(0, len(name), payload_size, journal.count, len(entries)))
+		record += name
+		record += sizes
+		for entry in entries:
+			record += entry
+		struct.pack_into("<I", record, 0, zlib.crc32(record[4:]))
+		return record
+
+	def _decode(self, record: bytes) -> tuple[str, JournalA]:
+		_, name_size, _, count, entry_count = self.RECORD.unpack_from(record)
+		start = self.RECORD.size + name_size
+		name = record[self.RECORD.size:start].decode("utf-8")
+		sizes = struct.unpack_from(f"<{entry_count}I", record, start)
+		offset = start + 4 * entry_count
+		journal = JournalA()
+		journal.count = count
+		for size in sizes:
+			journal.entries.append(record[offset:offset + size].decode("utf-8"))
+			offset += size
+		return name, journal
+
+
+if __name__ == "__main__":
+	import shutil
+	import sys
+	import tempfile
+	from timeit import default_timer as timer
+
+	# One journal per tenant, saved one file at a time and with the store
+	n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+	journals = {}
+	for i in range(n):
+		journal = JournalA()
+		for j in range(20):
+			journal.add_entry(f"Tenant {i} did thing number {j}")
+		journals[f"tenant-{i}"] = journal
+
+	directory = Path(tempfile.mkdtemp())
+	(directory / "files").mkdir()
+	start = timer()
+	for name, journal in journals.items():
+		FilePersistenceManager.save_to_file(journal, directory / "files" / f"{name}.txt")
+	print(f"Saving {n} journals:")
+	print(f" - one file each:  {timer() - start:.3f}s")
+
+	store = JournalStore(directory / "store")
+	for name, journal in journals.items():
+		store.put(name, journal)
+	start = timer()
+	store.flush()
+	print(f" - journal store:  {timer() - start:.3f}s")
+	journals["tenant-42"].add_entry("Changed after the first flush")
+	store.put("tenant-42", journals["tenant-42"])
+	start = timer()
+	store.flush()
+	print(f" - one changed:    {timer() - start:.6f}s")
+	store.close()
+
+	start = timer()
+	store = JournalStore(directory / "store")
+	print(f"Opening the store again: {timer() - start:.3f}s")
+	print("Last entry of tenant-42:", store.get("tenant-42").entries[-1])
+	store.close()
+	shutil.rmtree(directory)
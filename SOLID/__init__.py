@@ -0,0 +1,94 @@
+"""
+Examples of the SOLID principles, importable without running the demos.
+
+Submodules are only imported when one of their names is first used, so
+`from SOLID import BetterFilter` loads O.py and nothing else. Run a module to
+see its demo, e.g. `python -m SOLID.O`.
+"""
+from importlib import import_module
+
+
+_submodules = ("S", "O", "L", "I", "D")
+
+# name -> submodule it lives in
+_exports = {
+	# S - Single Responsibility Principle
+	"JournalA": "S",
+	"JournalB": "S",
+	"FilePersistenceManager": "S",
+	"JournalStore": "S",
+	# O - Open/Closed Principle
+	"MakePrintable": "O",
+	"Color": "O",
+	"Size": "O",
+	"Product": "O",
+	"ProductFilter": "O",
+	"Filter": "O",
+	"Specification": "O",
+	"AndSpecification": "O",
+	"OrSpecification": "O",
+	"BetterFilter": "O",
+	"ColorSpecification": "O",
+	"SizeSpecification": "O",
+	"SpecificationMetrics": "O",
+	"InstrumentedSpecification": "O",
+	"InstrumentedFilter": "O",
+	"InMemorySink": "O",
+	"LoggingSink": "O",
+	"PrometheusTextSink": "O",
+	"ProductCatalogSnapshot": "O",
+	# L - Liskov's Substitution Principle
+	"cached_shape_property": "L",
+	"Rectangle": "L",
+	"Square": "L",
+	"use_it": "L",
+	"RectangleFactory": "L",
+	"SquareFactory": "L",
+	"RectangleBatch": "L",
+	"RectangleIndex": "L",
+	"use_it_batch": "L",
+	# I - Interface Segregation Principle
+	"Machine": "I",
+	"MultiFunctionPrinter": "I",
+	"OldFashionedPrinter": "I",
+	"PrinterInterface": "I",
+	"ScannerInterface": "I",
+	"FaxInterface": "I",
+	"OldPrinter": "I",
+	"ModernPrinter": "I",
+	"capabilities_of": "I",
+	"DeviceRegistry": "I",
+	"DeviceDispatcher": "I",
+	"FakePrinter": "I",
+	"FakeMultiFunctionDevice": "I",
+	"StreamingPrinterInterface": "I",
+	"StreamingScannerInterface": "I",
+	"StreamingFaxInterface": "I",
+	"read_chunks": "I",
+	"mmap_chunks": "I",
+	"FakeStreamingDevice": "I",
+	# D - Dependency Inversion Principle
+	"Relationship": "D",
+	"Person": "D",
+	"Relationships": "D",
+	"Research": "D",
+	"RelationshipBrowser": "D",
+	"BetterRelationships": "D",
+	"BetterResearch": "D",
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+	if name in _submodules:
+		return import_module(f".{name}", __name__)
+	if name not in _exports:
+		raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+	value = getattr(import_module(f".{_exports[name]}", __name__), name)
+	globals()[name] = value  # next time it is found without __getattr__
+	return value
+
+
+def __dir__():
+	return sorted(set(globals()) | set(_exports) | set(_submodules))
@@ -0,0 +1,124 @@
+"""
+The binary snapshot layout shared by SOLID.O.ProductCatalogSnapshot and
+Builder.builder_facets.PersonRecords, both of which import it lazily:
+
+    header   magic, format version, record size, record count, string table offset
+    records  one fixed width record per item, packed with struct
+    strings  every distinct text once: count, end offsets (uint64), UTF-8 bytes
+
+SnapshotWriter writes such a file, and SnapshotFile maps one with mmap. Opening
+only reads the header; the records and texts are memoryviews into the map, so
+nothing is copied until it is used. What is in a record is up to the class
+using it, texts are stored in the records as their index in the string table.
+"""
+import mmap
+import struct
+from itertools import accumulate
+
+
+HEADER = struct.Struct("<4sHHQQ")
+COUNT = struct.Struct("<Q")
+SPAN = struct.Struct("<QQ")
+
+
+class SnapshotFile:
+    def __init__(self, filepath, magic: bytes, version: int, record: struct.Struct, kind: str) -> None:
+        with open(filepath, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < HEADER.size:
+                raise ValueError(f"{filepath} is not a {kind}")
+            file_magic, file_version, record_size, count, strings_offset = HEADER.unpack_from(self._map)
+            if file_magic != magic:
+                raise ValueError(f"{filepath} is not a {kind}")
+            if file_version != version or record_size != record.size:
+                raise ValueError(f"{filepath} has unsupported {kind} version {file_version}")
+            records_end = HEADER.size + count * record_size
+            if not records_end <= strings_offset <= len(self._map) - COUNT.size:
+                raise ValueError(f"{filepath} is truncated or corrupt")
+            self.string_count, = COUNT.unpack_from(self._map, strings_offset)
+            offsets_start = strings_offset + COUNT.size
+            strings_start = offsets_start + (self.string_count + 1) * COUNT.size
+            if strings_start > len(self._map):
+                raise ValueError(f"{filepath} is truncated or corrupt")
+            strings_size, = COUNT.unpack_from(self._map, strings_start - COUNT.size)
+            if strings_start + strings_size > len(self._map):
+                raise ValueError(f"{filepath} is truncated or corrupt")
+        except BaseException:
+            self._map.close()
+            raise
+        view = memoryview(self._map)
+        self.records = view[HEADER.size:records_end]
+        self._offsets = view[offsets_start:strings_start]
+        self._strings = view[strings_start:]
+        view.release()
+        self.count = count
+        self._indexes = None  # text -> string table index, built by the first find()
+
+    def close(self) -> None:
+        # The views have to go before the map can be closed
+        self.records.release()
+        self._offsets.release()
+        self._strings.release()
+        self._map.close()
+
+    def text(self, index: int) -> str:
+        start, end = SPAN.unpack_from(self._offsets, index * COUNT.size)
+        return str(self._strings[start:end], "utf-8")
+
+    def find(self, text: str) -> int | None:
+        """The string table index of text, or None if it is not stored."""
+        if self._indexes is None:
+            self._indexes = {self.text(index): index for index in range(self.string_count)}
+        return self._indexes.get(text)
+
+
+class SnapshotWriter:
+    # Records are written in chunks of about this many bytes
+    chunk_size = 1 << 16
+
+    def __init__(self, filepath, magic: bytes, version: int, record: struct.Struct) -> None:
+        self.magic = magic
+        self.version = version
+        self.record = record
+        self.count = 0
+        self._texts = {}  # text -> index in the string table
+        self._chunk = bytearray()
+        self._file = open(filepath, "wb")
+        # The header is written last, once the sizes are known
+        self._file.write(bytes(HEADER.size))
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, *args) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # Without a header the file is never mistaken for a complete snapshot
+            self._file.close()
+
+    def text(self, text: str) -> int:
+        """The string table index of text, adding it if it is new."""
+        if not isinstance(text, str):
+            raise TypeError(f"only str can be stored in the string table, not {type(text).__name__}")
+        return self._texts.setdefault(text, len(self._texts))
+
+    def add(self, *values) -> None:
+        self._chunk += self.record.pack(*values)
+        self.count += 1
+        if len(self._chunk) >= self.chunk_size:
+            self._file.write(self._chunk)
+            self._chunk.clear()
+
+    def close(self) -> None:
+        file = self._file
+        file.write(self._chunk)
+        strings_offset = file.tell()
+        encoded = [text.encode("utf-8") for text in self._texts]
+        file.write(COUNT.pack(len(encoded)))
+        file.write(struct.pack(f"<{len(encoded) + 1}Q", 0, *accumulate(map(len, encoded))))
+        file.writelines(encoded)
+        file.seek(0)
+        file.write(HEADER.pack(self.magic, self.version, self.record.size, self.count, strings_offset))
+        file.close()
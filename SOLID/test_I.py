@@ -0,0 +1,59 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from SOLID.I import DeviceDispatcher, FakeMultiFunctionDevice, FakePrinter
+
+
+class DeviceDispatcherTest(IsolatedAsyncioTestCase):
+	async def asyncSetUp(self):
+		self.dispatcher = DeviceDispatcher(max_batch=8, small_document_size=100)
+		self.printer = FakePrinter(latency=0.01)
+		self.mfd = FakeMultiFunctionDevice(latency=0.01)
+		self.dispatcher.add_device(self.printer)
+		self.dispatcher.add_device(self.mfd)
+
+	async def asyncTearDown(self):
+		await self.dispatcher.close()
+
+	async def test_small_documents_are_batched(self):
+		pages = [f'page {i}' for i in range(20)]
+		results = await asyncio.gather(*(self.dispatcher.submit(self.printer, 'print', page) for page in pages))
+		# Batches of 8, 8 and 4 pages, every job gets the result of its batch
+		self.assertEqual([document.count('\n') + 1 for _, document in self.printer.calls], [8, 8, 4])
+		self.assertEqual(results[0], ('print', len('\n'.join(pages[:8]))))
+		self.assertEqual(results[-1], ('print', len('\n'.join(pages[16:]))))
+
+	async def test_large_documents_are_not_batched(self):
+		document = 'x' * 100
+		await asyncio.gather(*(self.dispatcher.submit(self.printer, 'print', document) for _ in range(3)))
+		self.assertEqual(len(self.printer.calls), 3)
+
+	async def test_cancelled_job_is_not_run(self):
+		faxes = [self.dispatcher.submit(self.mfd, 'fax', f'fax {i}' * 50) for i in range(3)]
+		faxes[1].cancel()
+		await self.dispatcher.join()
+		self.assertEqual([document for _, document in self.mfd.calls], ['fax 0' * 50, 'fax 2' * 50])
+
+	async def test_stats(self):
+		jobs = [self.dispatcher.submit(self.mfd, 'scan', 'y' * 100) for _ in range(2)]
+		self.assertEqual(self.dispatcher.stats()['queue_depth'][self.mfd, 'scan'], 2)
+		await asyncio.gather(*jobs)
+		stats = self.dispatcher.stats()
+		self.assertEqual(stats['queue_depth'][self.mfd, 'scan'], 0)
+		self.assertEqual(stats['latency']['scan']['jobs'], 2)
+		self.assertGreater(stats['latency']['scan']['max'], 0)
+		self.assertEqual(stats['latency']['print']['jobs'], 0)
+
+	async def test_close_cancels_pending_jobs(self):
+		jobs = [self.dispatcher.submit(self.printer, 'print', 'z' * 100) for _ in range(3)]
+		await asyncio.sleep(0)  # the first job is running, the others are queued
+		await self.dispatcher.close()
+		self.assertTrue(all(job.cancelled() for job in jobs))
+		with self.assertRaises(RuntimeError):
+			self.dispatcher.submit(self.printer, 'print', 'page')
+
+	async def test_dispatch_releases_device(self):
+		result = await self.dispatcher.dispatch('fax', 'page')
+		self.assertEqual(result, ('fax', 4))
+		# The multifunction device is the only fax, it is free again
+		self.assertEqual(await self.dispatcher.dispatch('fax', 'page'), ('fax', 4))
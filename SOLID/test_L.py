@@ -0,0 +1,18 @@
+from unittest import TestCase
+
+from SOLID.L import RectangleBatch, use_it_batch
+
+
+class RectangleBatchTest(TestCase):
+	def test_resize_promotes_dtype(self):
+		batch = RectangleBatch([1, 2], [3, 4]).resize(width=2.5)
+		self.assertEqual(batch.widths.tolist(), [2.5, 2.5])
+		self.assertEqual(batch.total_area(), 17.5)
+
+		batch = RectangleBatch([1, 2], [3, 4]).resize(height=2 ** 70)
+		self.assertEqual(batch.total_area(), 3 * 2 ** 70)
+
+	def test_use_it_batch_large_widths(self):
+		# w * 10 does not fit in int64 any more
+		batch = RectangleBatch([2 ** 62, 3], [1, 1])
+		self.assertEqual(use_it_batch(batch).tolist(), [True, True])
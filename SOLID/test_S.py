@@ -0,0 +1,107 @@
+import errno
+import os
+import tempfile
+from pathlib import Path
+from unittest import TestCase, mock
+
+from SOLID.S import JournalA, JournalStore
+
+
+def journal(*entries):
+	journal = JournalA()
+	for entry in entries:
+		journal.add_entry(entry)
+	return journal
+
+
+class JournalStoreTest(TestCase):
+	def setUp(self):
+		self._directory = tempfile.TemporaryDirectory()
+		self.directory = Path(self._directory.name)
+
+	def tearDown(self):
+		self._directory.cleanup()
+
+	def open_store(self):
+		# One segment, so every journal ends up in the same file
+		store = JournalStore(self.directory, segments=1)
+		self.addCleanup(store.close)
+		return store
+
+	def test_reopen(self):
+		store = self.open_store()
+		store.put("a", journal("one", "two"))
+		store.put("b", journal())
+		self.assertEqual(store.flush(), 2)
+		store.close()
+
+		store = self.open_store()
+		self.assertEqual(len(store), 2)
+		self.assertEqual(store.get("a").entries, ["1: one", "2: two"])
+		self.assertEqual(store.get("a").count, 2)
+		self.assertEqual(store.get("b").entries, [])
+
+	def test_partial_write(self):
+		store = self.open_store()
+		store.put("a", journal("one"))
+		store.flush()
+
+		real_write = os.write
+
+		def write_some_then_fail(fd, data):
+			real_write(fd, bytes(data[:10]))
+			raise OSError(errno.ENOSPC, "No space left on device")
+
+		store.put("b", journal("two"))
+		with mock.patch("os.write", write_some_then_fail):
+			with self.assertRaises(OSError):
+				store.flush()
+		# The failed journal stays dirty and is written with the next flush
+		store.put("c", journal("three"))
+		self.assertEqual(store.flush(), 2)
+		self.assertEqual(store.get("c").entries, ["1: three"])
+		store.close()
+
+		store = self.open_store()
+		self.assertEqual(len(store), 3)
+		self.assertEqual(store.get("b").entries, ["1: two"])
+		self.assertEqual(store.get("c").entries, ["1: three"])
+
+	def test_torn_tail_record(self):
+		store = self.open_store()
+		store.put("a", journal("one"))
+		store.flush()
+		store.put("b", journal("two " * 20))
+		store.flush()
+		store.close()
+
+		# The header of b made it to disk, but not all of its payload
+		segment = self.directory / JournalStore.SEGMENT_NAME.format(0)
+		size = segment.stat().st_size
+		with open(segment, "r+b") as f:
+			f.seek(size - 10)
+			f.write(bytes(10))
+
+		store = self.open_store()
+		self.assertNotIn("b", store)
+		self.assertEqual(store.get("a").entries, ["1: one"])
+		store.put("c", journal("three"))
+		store.flush()
+		store.close()
+
+		store = self.open_store()
+		self.assertEqual(len(store), 2)
+		self.assertEqual(store.get("c").entries, ["1: three"])
+
+	def test_compact(self):
+		store = self.open_store()
+		store.put("a", journal("one"))
+		store.flush()
+		store.put("a", journal("one", "two"))
+		store.flush()
+		self.assertGreater(store.compact(), 0)
+		self.assertEqual(store.get("a").entries, ["1: one", "2: two"])
+		store.close()
+
+		store = self.open_store()
+		self.assertEqual(store.get("a").entries, ["1: one", "2: two"])
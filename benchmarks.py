@@ -0,0 +1,238 @@
+"""
+Benchmarks for the examples in SOLID/ and Builder/.
+
+Every benchmark runs at a few data sizes and the fastest of several repeats is
+kept. The results are written as JSON, and can be compared with a baseline from
+an earlier run. The run fails when a benchmark got slower than the baseline by
+more than the threshold. Nothing here needs a network connection.
+
+    python benchmarks.py --save-baseline         # record benchmark_baseline.json
+    python benchmarks.py                         # compare with it
+    python benchmarks.py --threshold 0.1 --sizes 100 1000
+"""
+import argparse
+import json
+import platform
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+from timeit import Timer
+
+
+DEFAULT_SIZES = (100, 1_000, 10_000)
+DEFAULT_RESULTS = Path("benchmark_results.json")
+DEFAULT_BASELINE = Path("benchmark_baseline.json")
+
+# name -> function that takes a data size, prepares the data, and returns
+# the callable to time, or a (callable, cleanup) pair when something has to
+# be closed after timing
+BENCHMARKS = {}
+
+# Benchmarks that need files create them in here, run() removes it at the end
+_workdir = None
+
+
+def scratch_path(name):
+    """A path for a new file or directory that is removed after the run."""
+    directory = Path(tempfile.mkdtemp(dir=_workdir))
+    return directory / name
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+@benchmark("O.BetterFilter.filter")
+def filter_products(size):
+    from SOLID.O import BetterFilter, Color, ColorSpecification, Product, Size, SizeSpecification
+
+    colors, sizes = list(Color), list(Size)
+    products = [
+        Product(f"Product {i}", colors[i % len(colors)], sizes[i % len(sizes)])
+        for i in range(size)
+    ]
+    spec = (SizeSpecification(Size.LARGE) & ColorSpecification(Color.GREEN)) | ColorSpecification(Color.YELLOW)
+    bf = BetterFilter()
+    return lambda: list(bf.filter(products, spec))
+
+
+@benchmark("O.ProductCatalogSnapshot.matching")
+def filter_catalog_snapshot(size):
+    from SOLID.O import Color, ColorSpecification, Product, ProductCatalogSnapshot, Size, SizeSpecification
+
+    colors, sizes = list(Color), list(Size)
+    products = (
+        Product(f"Product {i}", colors[i % len(colors)], sizes[i % len(sizes)])
+        for i in range(size)
+    )
+    filepath = scratch_path("catalog.bin")
+    ProductCatalogSnapshot.save(products, filepath)
+    catalog = ProductCatalogSnapshot(filepath)
+    spec = (SizeSpecification(Size.LARGE) & ColorSpecification(Color.GREEN)) | ColorSpecification(Color.YELLOW)
+    return (lambda: list(catalog.matching(spec))), catalog.close
+
+
+@benchmark("D.BetterRelationships.find_all_children_of")
+def find_children(size):
+    from SOLID.D import BetterRelationships, Person
+
+    relationships = BetterRelationships()
+    for i in range(size):
+        relationships.add_parent_and_child(Person(f"Parent {i % 100}"), Person(f"Child {i}"))
+    return lambda: list(relationships.find_all_children_of("Parent 42"))
+
+
+@benchmark("S.FilePersistenceManager.save_and_load")
+def save_and_load_journal(size):
+    from SOLID.S import FilePersistenceManager, JournalA
+
+    journal = JournalA()
+    for i in range(size):
+        journal.add_entry(f"Entry number {i}")
+    filepath = scratch_path("journal.txt")
+
+    def save_and_load():
+        FilePersistenceManager.save_to_file(journal, filepath)
+        return FilePersistenceManager.load_from_file(filepath)
+    return save_and_load
+
+
+@benchmark("S.JournalStore.flush")
+def flush_journal_store(size):
+    from SOLID.S import JournalA, JournalStore
+
+    journals = {}
+    for i in range(size):
+        journal = journals[f"tenant-{i}"] = JournalA()
+        for j in range(10):
+            journal.add_entry(f"Entry number {j}")
+    directory = scratch_path("store")
+    store = JournalStore(directory)
+
+    def save_all():
+        for name, journal in journals.items():
+            store.put(name, journal)
+        return store.flush()
+
+    def cleanup():
+        store.close()
+        # The segments grow with every timed flush, so do not keep them around
+        shutil.rmtree(directory)
+    return save_all, cleanup
+
+
+@benchmark("ordinary_builder.HtmlElement.__str__")
+def render_html(size):
+    from Builder.ordinary_builder import HtmlBuilder
+
+    builder = HtmlBuilder("ul")
+    for i in range(size):
+        builder.add_child("li", f"item {i}")
+    return lambda: str(builder)
+
+
+@benchmark("builder_facets.PersonBuilder(copy=True)")
+def build_copied_people(size):
+    from Builder.builder_facets import PersonBuilder
+
+    template = PersonBuilder().lives.at("123 London Road").in_city("London").works.at("Fabrikam").build()
+
+    def build_people():
+        for i in range(size):
+            PersonBuilder(template, copy=True).lives.with_postcode(str(i)).build()
+    return build_people
+
+
+@benchmark("exercise.CodeBuilder.__str__")
+def generate_code(size):
+    from Builder.exercise import CodeBuilder
+
+    fields = [(f"field_{i}", i) for i in range(size)]
+    return lambda: str(CodeBuilder("Generated").add_fields(fields))
+
+
+def run(names, sizes, repeat):
+    global _workdir
+    with tempfile.TemporaryDirectory(prefix="benchmarks-") as _workdir:
+        try:
+            return _run(names, sizes, repeat)
+        finally:
+            _workdir = None
+
+
+def _run(names, sizes, repeat):
+    results = {}
+    for name in names:
+        for size in sizes:
+            prepared = BENCHMARKS[name](size)
+            func, cleanup = prepared if isinstance(prepared, tuple) else (prepared, None)
+            try:
+                timer = Timer(func)
+                number, _ = timer.autorange()
+                seconds = min(timer.repeat(repeat, number)) / number
+            finally:
+                if cleanup is not None:
+                    cleanup()
+            results[f"{name}[{size}]"] = seconds
+            print(f"{name}[{size}]: {seconds * 1000:.3f} ms")
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Returns the benchmarks that got slower than the baseline allows."""
+    regressions = []
+    for key, seconds in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        change = seconds / before - 1
+        print(f"{key}: {change:+.1%}")
+        if change > threshold:
+            regressions.append((key, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 is 20%%")
+    args = parser.parse_args(argv)
+
+    results = run(args.only, args.sizes, args.repeat)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    print()
+    print(f"Compared with {args.baseline}:")
+    baseline = json.loads(args.baseline.read_text())["results"]
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print()
+        for key, change in regressions:
+            print(f"REGRESSION {key}: {change:+.1%} (threshold {args.threshold:.0%})")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())